@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Pure-Python Aho-Corasick automaton for finding many literal strings at once.
+
+All keywords are compiled into one trie with failure links, so a single
+left-to-right pass over the text reports every occurrence of every keyword,
+including overlapping ones. The cost of a scan depends on the length of the
+text and the number of matches, not on how many keywords were added.
+"""
+from collections import deque
+
+class AhoCorasick:
+    """
+    Multi-keyword matcher.
+
+    Keywords are added with add(), compiled once with build() (called
+    automatically on the first search) and then searched with iter_matches().
+    """
+
+    __slots__ = ('_goto', '_fail', '_own', '_output', '_built')
+
+    def __init__(self, keywords=()):
+        # State 0 is the root; each state maps a character to the next state
+        self._goto = [{}]
+        self._fail = [0]
+        # Keywords ending at each state, and those plus everything its failure links lead to
+        self._own = [()]
+        self._output = [()]
+        self._built = False
+        for keyword in keywords:
+            self.add(keyword)
+
+    def __len__(self):
+        return sum(len(own) for own in self._own)
+
+    def add(self, keyword, value=None):
+        """
+        Add a keyword to the automaton.
+
+        Args:
+            keyword: The literal string to find
+            value: Reported with every match of the keyword (defaults to the keyword itself)
+        """
+        if not keyword:
+            raise ValueError("Cannot add an empty keyword")
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(())
+            state = next_state
+        self._own[state] += ((len(keyword), keyword if value is None else value),)
+        self._built = False
+
+    def build(self):
+        """
+        Compute failure links breadth first and merge the outputs they lead to.
+
+        The merged outputs are rebuilt from each state's own keywords, so
+        building again (e.g. after more add() calls) never repeats a match.
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output = list(self._own)
+        queue = deque()
+        for state in goto[0].values():
+            fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                output[next_state] = self._own[next_state] + output[fail[next_state]]
+        self._built = True
+
+    def iter_matches(self, text):
+        """
+        Yield (start, end, value) for every keyword occurrence, ordered by end position.
+        """
+        if not self._built:
+            self.build()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        root = goto[0]
+        state = 0
+        for end, char in enumerate(text, 1):
+            if state == 0:
+                # Most characters cannot start a keyword; skip them without touching the failure links
+                state = root.get(char, 0)
+            else:
+                next_state = goto[state].get(char)
+                while next_state is None and state:
+                    state = fail[state]
+                    next_state = goto[state].get(char)
+                state = next_state or 0
+            if output[state]:
+                for length, value in output[state]:
+                    yield end - length, end, value
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Compare the compact TipTap AST with the decoded dict/list trees.
+
+Loads the study notes and key terms, checks that rendering every document
+from the CompactCorpus gives exactly the same USFM as rendering its dict
+trees, then reports the memory held by each representation (measured with
+tracemalloc while building it), the pickled size, and the time to render
+the whole corpus from each.
+
+Run from the repository root:
+
+    python benchmarks/bench_compact_ast.py
+"""
+import glob
+import io
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import json_backend
+from keyterm_corpus import build_resource_map
+from tiptap_ast import build_compact_corpus
+from tiptap_render import TiptapRenderer
+
+JSON_FILES = sorted(glob.glob("./json BiblicaStudyNotes/json/*.json") +
+                    glob.glob("./json BiblicaStudyNotesKeyTerms/json/*.json"))
+
+def load_trees():
+    # Plain dict/list trees, as the stdlib json backend decodes them
+    json_backend.set_backend('json')
+    return [(json_file, json_backend.load_document(json_file)) for json_file in JSON_FILES]
+
+def measure(function, *args):
+    tracemalloc.start()
+    result = function(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+def render_trees(renderer, documents):
+    out = io.StringIO()
+    for _, data in documents:
+        renderer.render([content_item.tiptap for content_item in data.content], out)
+    return out
+
+def render_compact(renderer, corpus):
+    out = io.StringIO()
+    for doc_index in range(len(corpus)):
+        renderer.render_compact(corpus, doc_index, out)
+    return out
+
+def best_of(function, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    renderer = TiptapRenderer(build_resource_map("./json BiblicaStudyNotesKeyTerms/json/"))
+
+    documents, tree_bytes = measure(load_trees)
+    corpus, compact_bytes = measure(build_compact_corpus, documents)
+
+    for doc_index, (json_file, data) in enumerate(documents):
+        expected = renderer.render_to_string([content_item.tiptap for content_item in data.content])
+        out = io.StringIO()
+        renderer.render_compact(corpus, doc_index, out)
+        if out.getvalue() != expected:
+            raise SystemExit(f"Output differs for {json_file}")
+    print(f"Identical output on {len(documents)} corpus documents")
+
+    restored = pickle.loads(pickle.dumps(corpus))
+    if render_compact(renderer, restored).getvalue() != render_compact(renderer, corpus).getvalue():
+        raise SystemExit("Output differs after a pickle round trip")
+
+    nodes = len(corpus.node_type)
+    print(f"Nodes: {nodes}, distinct marks: {len(corpus.marks)}, text pool: {len(corpus.text_pool)} chars")
+    print(f"Decoded trees: {tree_bytes / 1e6:8.2f} MB ({tree_bytes / nodes:.0f} B/node, incl. document structs)")
+    print(f"Compact AST:   {compact_bytes / 1e6:8.2f} MB ({compact_bytes / nodes:.0f} B/node)")
+    print(f"Pickled compact AST: {len(pickle.dumps(corpus)) / 1e6:.2f} MB")
+
+    # Render without the Scripture reference filter so the traversal itself is timed
+    plain = TiptapRenderer(renderer.resource_map, text_filter=str)
+    print(f"Render from trees:   {best_of(render_trees, plain, documents) * 1000:.1f} ms")
+    print(f"Render from compact: {best_of(render_compact, plain, corpus) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
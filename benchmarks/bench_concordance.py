@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark key term concordance queries against re-walking every study note.
+
+Writes the concordance for all study notes, then checks every term's
+occurrences against two independent sources:
+- the run table (run_table.RunTable), with offsets recomputed from its columns;
+- the plain text of each paragraph, which must contain the surface text at
+  the recorded offset.
+Then times answering "where is this term used" for every term, from the
+concordance and by walking all the TipTap trees again.
+
+Run from the repository root:
+
+    python benchmarks/bench_concordance.py
+"""
+import glob
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from build_manifest import referenced_resources
+from concordance import note_occurrences, read_concordance, write_concordance
+from json_backend import load_document
+from run_table import build_run_table
+from verse_table import note_id
+
+def main():
+    documents = [(os.path.basename(json_file), load_document(json_file))
+                 for json_file in sorted(glob.glob("./json BiblicaStudyNotes/json/*.json"))]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        concordance_file = os.path.join(tmp_dir, "concordance.idx")
+        total = write_concordance(((note_id(filename), note_occurrences(data)) for filename, data in documents),
+                                  concordance_file)
+        size = os.path.getsize(concordance_file)
+        concordance = read_concordance(concordance_file)
+
+    # Expected occurrences from the run table's columns
+    table = build_run_table(documents)
+    expected = defaultdict(list)
+    paragraph_text = defaultdict(str)
+    for doc_id, filename in enumerate(table.filenames):
+        for row in range(table.doc_start[doc_id], table.doc_start[doc_id + 1]):
+            key = (note_id(filename), table.paragraph_idx[row])
+            code = table.resource_id[row]
+            if code >= 0:
+                expected[table.resource_ids[code]].append(
+                    (key[0], key[1], len(paragraph_text[key]), table.run_text[row]))
+            paragraph_text[key] += table.run_text[row]
+
+    if sorted(expected) != concordance.resource_ids:
+        raise SystemExit("Concordance terms differ from the run table")
+    for resource_id, occurrences in expected.items():
+        found = concordance.occurrences(resource_id)
+        if [tuple(occurrence) for occurrence in found] != sorted(occurrences):
+            raise SystemExit(f"Occurrences differ for resourceId {resource_id}")
+        for occurrence in found:
+            text = paragraph_text[(occurrence.note_id, occurrence.paragraph)]
+            if text[occurrence.offset:occurrence.offset + len(occurrence.text)] != occurrence.text:
+                raise SystemExit(f"Offset does not point at the surface text for resourceId {resource_id}")
+    print(f"Identical occurrences for {len(concordance)} terms ({total} links, {size} bytes on disk)")
+
+    start = time.perf_counter()
+    for resource_id in concordance.resource_ids:
+        concordance.occurrences(resource_id)
+    queried = (time.perf_counter() - start) / len(concordance)
+
+    terms = concordance.resource_ids[:20]
+    start = time.perf_counter()
+    for resource_id in terms:
+        [filename for filename, data in documents
+         if resource_id in referenced_resources([item.tiptap for item in data.content])]
+    walked = (time.perf_counter() - start) / len(terms)
+
+    print(f"Term lookup, concordance:   {queried * 1e6:10.1f} us")
+    print(f"Term lookup, re-walk notes: {walked * 1e6:10.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Aho-Corasick reference detector as the book/alias table grows.
+
+First checks, on every text segment of the corpus, that the detector finds
+exactly the rule matches (overlapping ones included) that running each
+rule's regex at every position finds. Then times one detection pass over the
+corpus for the standard 66-book table and for tables padded with synthetic
+aliases, next to a single compiled alternation of all rules, whose
+per-position cost grows with the table.
+
+Run from the repository root:
+
+    python benchmarks/bench_reference_detector.py
+"""
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from json_backend import load_document
+from keyterm_corpus import build_resource_map
+from reference_detector import BIBLE_BOOKS, ReferenceDetector, compile_reference_pattern, reference_rules
+from tiptap_render import TiptapRenderer
+
+def corpus_segments():
+    segments = []
+    renderer = TiptapRenderer(build_resource_map("./json BiblicaStudyNotesKeyTerms/json/"),
+                              text_filter=lambda text: segments.append(text) or text)
+    json_files = sorted(glob.glob("./json BiblicaStudyNotes/json/*.json") +
+                        glob.glob("./json BiblicaStudyNotesKeyTerms/json/*.json"))
+    for json_file in json_files:
+        renderer.render_to_string([item.tiptap for item in load_document(json_file).content])
+    return segments
+
+def brute_force_matches(patterns, text):
+    matches = []
+    for index, pattern in enumerate(patterns):
+        for match in pattern.finditer(text):
+            matches.append((match.start(), match.start() + len(match.group(1)), index))
+    return sorted(matches)
+
+def alias_table(aliases_per_book):
+    # Synthetic aliases that never occur in the corpus, so only the table size changes
+    books = list(BIBLE_BOOKS)
+    for i in range(1, aliases_per_book):
+        books.extend(f"{book} Alias{i}" for book in BIBLE_BOOKS)
+    return books
+
+def timed(function, segments):
+    start = time.perf_counter()
+    for segment in segments:
+        function(segment)
+    return time.perf_counter() - start
+
+def main():
+    segments = corpus_segments()
+
+    detector = ReferenceDetector()
+    patterns = [re.compile(f"(?=({pattern}))") for _, pattern, _ in detector.rules]
+    for segment in segments:
+        if detector.find_matches(segment) != brute_force_matches(patterns, segment):
+            raise SystemExit(f"Detector differs on segment {segment[:60]!r}")
+    print(f"Identical matches on {len(segments)} corpus segments")
+
+    print(f"{'books+aliases':>14} {'rules':>6} {'aho-corasick ms':>16} {'alternation ms':>15}")
+    for aliases_per_book in (1, 4, 16):
+        rules = reference_rules(alias_table(aliases_per_book))
+        detector = ReferenceDetector(rules)
+        alternation = compile_reference_pattern(rules)
+        automaton = timed(detector.find_matches, segments)
+        regex = timed(alternation.findall, segments)
+        print(f"{66 * aliases_per_book:>14} {len(rules):>6} {automaton * 1000:>16.1f} {regex * 1000:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark format_scripture_references against the original rule-by-rule version.
+
+The original implementation (seven str.replace calls followed by one re.sub
+per book for each of three patterns) lives in tests/test_scripture_references.py,
+which checks that both give the same output on the corpus. Here the exact
+text segments the renderer filters during a real export are collected and
+run through each.
+
+Run from the repository root:
+
+    python benchmarks/bench_scripture_references.py
+"""
+import glob
+import os
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, os.pardir))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, os.pardir, "tests"))
+
+from json_backend import load_document
+from keyterm_corpus import build_resource_map
+from tiptap_render import TiptapRenderer
+from usfm_common import format_scripture_references
+from test_scripture_references import legacy_format_scripture_references
+
+def load_corpus():
+    json_files = sorted(glob.glob("./json BiblicaStudyNotes/json/*.json") +
+                        glob.glob("./json BiblicaStudyNotesKeyTerms/json/*.json"))
+    return [(json_file, [item.tiptap for item in load_document(json_file).content]) for json_file in json_files]
+
+def text_segments(documents, resource_map):
+    # The exact strings the renderer passes to the filter during a real export
+    segments = []
+    renderer = TiptapRenderer(resource_map, text_filter=lambda text: segments.append(text) or text)
+    for _, tiptap_content in documents:
+        renderer.render_to_string(tiptap_content)
+    return segments
+
+def best_of(function, segments, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for segment in segments:
+            function(segment)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    resource_map = build_resource_map("./json BiblicaStudyNotesKeyTerms/json/")
+    documents = load_corpus()
+
+    segments = text_segments(documents, resource_map)
+    characters = sum(len(segment) for segment in segments)
+    print(f"{len(segments)} text segments, {characters} characters")
+    annotated = best_of(format_scripture_references, segments)
+    legacy = best_of(legacy_format_scripture_references, segments)
+    print(f"Span annotation: {annotated * 1000:7.1f} ms ({annotated / characters * 1e9:.0f} ns/char)")
+    print(f"Rule by rule:   {legacy * 1000:8.1f} ms ({legacy / characters * 1e9:.0f} ns/char)")
+    print(f"Speedup: {legacy / annotated:.1f}x")
+
+if __name__ == "__main__":
+    main()
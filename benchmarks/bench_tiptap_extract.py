@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark TiptapRenderer.render on synthetic documents.
+
+Builds documents of 10^3 to 10^6 text nodes (flat paragraphs, one in five
+nodes carrying a resourceReference mark) plus one deeply nested document,
+and reports time per node so linear scaling is easy to see. The recursive
+extractor the converters started from is timed alongside as a reference.
+Before anything is timed, both are checked to produce identical output on
+every synthetic document and on the real corpus. The renderer runs without
+Scripture reference formatting or bibleReference handling for that check,
+since the old extractor did neither.
+
+Run from the repository root:
+
+    python benchmarks/bench_tiptap_extract.py
+"""
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from json_backend import load_document
+from keyterm_corpus import build_resource_map
+from tiptap_render import TiptapRenderer
+
+RESOURCE_MAP = {"1": "term"}
+
+def plain_renderer(resource_map):
+    """
+    A renderer producing the same text as recursive_extract: \\k markers only.
+    """
+    renderer = TiptapRenderer(resource_map, text_filter=str)
+    renderer.mark_handlers['bibleReference'] = None
+    return renderer
+
+def recursive_extract(tiptap_content, resource_map=None):
+    """
+    The original recursive extractor, kept for comparison.
+    """
+    if isinstance(tiptap_content, dict):
+        if 'text' in tiptap_content:
+            text = tiptap_content['text']
+            if 'marks' in tiptap_content:
+                for mark in tiptap_content.get('marks', []):
+                    if mark.get('type') == 'resourceReference':
+                        resource_id = mark.get('attrs', {}).get('resourceId')
+                        if resource_map and resource_id in resource_map:
+                            return f"\\k {text}\\k*"
+            return text
+        if 'content' in tiptap_content:
+            result = ""
+            for item in tiptap_content['content']:
+                result += recursive_extract(item, resource_map)
+            return result
+    elif isinstance(tiptap_content, list):
+        result = ""
+        for item in tiptap_content:
+            result += recursive_extract(item, resource_map)
+        return result
+    return ""
+
+def text_node(i):
+    node = {"type": "text", "text": f"word{i} "}
+    if i % 5 == 0:
+        node["marks"] = [{"type": "resourceReference", "attrs": {"resourceId": "1"}}]
+    return node
+
+def flat_document(text_nodes, per_paragraph=100):
+    paragraphs = []
+    for start in range(0, text_nodes, per_paragraph):
+        end = min(start + per_paragraph, text_nodes)
+        paragraphs.append({"type": "paragraph", "content": [text_node(i) for i in range(start, end)]})
+    return {"type": "doc", "content": paragraphs}
+
+def nested_document(depth):
+    node = text_node(0)
+    for _ in range(depth):
+        node = {"type": "paragraph", "content": [node, text_node(1)]}
+    return {"type": "doc", "content": [node]}
+
+def best_of(function, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def check_corpus():
+    resource_map = build_resource_map("./json BiblicaStudyNotesKeyTerms/json/")
+    renderer = plain_renderer(resource_map)
+    json_files = glob.glob("./json BiblicaStudyNotes/json/*.json") + glob.glob("./json BiblicaStudyNotesKeyTerms/json/*.json")
+    for json_file in json_files:
+        for item in load_document(json_file).content:
+            if renderer.render_to_string(item.tiptap) != recursive_extract(item.tiptap, resource_map):
+                raise SystemExit(f"Output differs for {json_file}")
+    print(f"Identical output on {len(json_files)} corpus documents")
+
+def main():
+    check_corpus()
+    renderer = plain_renderer(RESOURCE_MAP)
+
+    print(f"{'text nodes':>12} {'renderer ms':>13} {'ns/node':>9} {'recursive ms':>14} {'ns/node':>9}")
+    for text_nodes in (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6):
+        document = flat_document(text_nodes)
+        if renderer.render_to_string(document) != recursive_extract(document, RESOURCE_MAP):
+            raise SystemExit(f"Output differs for {text_nodes} text nodes")
+        rendered = best_of(renderer.render_to_string, document)
+        recursive = best_of(recursive_extract, document, RESOURCE_MAP)
+        print(f"{text_nodes:>12} {rendered * 1000:>13.1f} {rendered / text_nodes * 1e9:>9.0f} "
+              f"{recursive * 1000:>14.1f} {recursive / text_nodes * 1e9:>9.0f}")
+
+    depth = 10 ** 5
+    document = nested_document(depth)
+    elapsed = best_of(renderer.render_to_string, document)
+    print(f"Nested depth {depth}: renderer {elapsed * 1000:.1f} ms")
+    try:
+        recursive_extract(document, RESOURCE_MAP)
+        print(f"Nested depth {depth}: recursive completed")
+    except RecursionError:
+        print(f"Nested depth {depth}: recursive hit the recursion limit")
+
+if __name__ == "__main__":
+    main()
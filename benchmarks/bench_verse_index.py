@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark verse index lookups against scanning every study note.
+
+Builds the index from the study note filenames and checks it against a
+linear scan for every verse key at the edge of a note and for whole-chapter
+ranges. Then times point queries for one verse of every chapter that has
+notes.
+
+Run from the repository root:
+
+    python benchmarks/bench_verse_index.py
+"""
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from scripture_refs import parse_passage_filename, split_key, verse_key, END_OF_CHAPTER
+from verse_index import read_verse_index, write_verse_index
+
+def scan(notes, start_key, end_key):
+    return [filename for (start, end), filename in notes if start <= end_key and end >= start_key]
+
+def timed(function, queries, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            function(*query)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+def main():
+    notes = []
+    for json_file in sorted(glob.glob("./json BiblicaStudyNotes/json/*.json")):
+        reference = parse_passage_filename(json_file)
+        if reference is not None:
+            notes.append(((reference.start_key, reference.end_key), os.path.basename(json_file)))
+    notes.sort()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_file = os.path.join(tmp_dir, "verse_index.idx")
+        write_verse_index(notes, index_file)
+        index = read_verse_index(index_file)
+
+    queries = set()
+    for (start, end), _ in notes:
+        for key in (start - 1, start, end, end + 1):
+            queries.add((key, key))
+        book, chapter, _ = split_key(start)
+        queries.add((verse_key(book, chapter, 1), verse_key(book, chapter, END_OF_CHAPTER)))
+    for start_key, end_key in sorted(queries):
+        found = [entry.filename for entry in index.overlapping(start_key, end_key)]
+        if found != scan(notes, start_key, end_key):
+            raise SystemExit(f"Index differs from scan for {start_key}-{end_key}")
+    print(f"Identical results to a linear scan for {len(queries)} queries over {len(index)} notes")
+
+    chapters = sorted({split_key(start)[:2] for (start, _), _ in notes})
+    points = [(verse_key(book, chapter, 3),) * 2 for book, chapter in chapters]
+    indexed = timed(index.overlapping, points)
+    scanned = timed(lambda start_key, end_key: scan(notes, start_key, end_key), points)
+    print(f"Point query, interval index: {indexed * 1e6:7.2f} us")
+    print(f"Point query, linear scan:    {scanned * 1e6:7.2f} us")
+
+if __name__ == "__main__":
+    main()
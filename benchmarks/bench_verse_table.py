@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark the dense per-verse table against the verse interval index.
+
+Builds both from the study note filenames and checks that every verse of
+the versification maps to the same notes. Then times opening the table and
+looking up every verse with each structure.
+
+Run from the repository root:
+
+    python benchmarks/bench_verse_table.py
+"""
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from scripture_refs import parse_passage_filename
+from versification import TOTAL_VERSES, key_from_ordinal
+from verse_index import read_verse_index, write_verse_index
+from verse_table import note_id, read_verse_table, write_verse_table
+
+def main():
+    passages = []
+    for json_file in sorted(glob.glob("./json BiblicaStudyNotes/json/*.json")):
+        reference = parse_passage_filename(json_file)
+        if reference is not None:
+            passages.append(((reference.start_key, reference.end_key), os.path.basename(json_file)))
+    keys = [key_from_ordinal(ordinal) for ordinal in range(TOTAL_VERSES)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_file = os.path.join(tmp_dir, "verse_index.idx")
+        table_file = os.path.join(tmp_dir, "verse_notes.tbl")
+        write_verse_index(passages, index_file)
+        entries = write_verse_table(passages, table_file)
+        index = read_verse_index(index_file)
+
+        start = time.perf_counter()
+        table = read_verse_table(table_file)
+        opened = time.perf_counter() - start
+
+        with table:
+            for ordinal, key in enumerate(keys):
+                expected = sorted(note_id(entry.filename) for entry in index.covering(key))
+                if sorted(table.notes_at(ordinal)) != expected:
+                    raise SystemExit(f"Table differs from index at verse key {key}")
+            print(f"Identical notes for all {TOTAL_VERSES} verses ({entries} verse-note entries)")
+
+            start = time.perf_counter()
+            for ordinal in range(TOTAL_VERSES):
+                table.notes_at(ordinal)
+            dense = (time.perf_counter() - start) / TOTAL_VERSES
+
+            start = time.perf_counter()
+            for key in keys:
+                index.covering(key)
+            interval = (time.perf_counter() - start) / TOTAL_VERSES
+
+    print(f"Open verse table (mmap):   {opened * 1e6:7.1f} us")
+    print(f"Lookup, dense table:       {dense * 1e6:7.2f} us")
+    print(f"Lookup, interval index:    {interval * 1e6:7.2f} us")
+
+if __name__ == "__main__":
+    main()
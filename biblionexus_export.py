@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+biblionexus-export: one entry point for every USFM export target.
+
+    python biblionexus_export.py keyterms     # BiblicaKeyTerms.sfm
+    python biblionexus_export.py studynotes   # usfm_study_notes/*_StudyNotes.SFM
+    python biblionexus_export.py all          # both, sharing one loaded corpus
+    python biblionexus_export.py watch        # regenerate outputs as inputs change
+    python biblionexus_export.py daemon       # serve rebuild requests over a Unix socket
+    python biblionexus_export.py client rebuild book GEN
+
+The key term corpus (and the resource map derived from it) is loaded once per
+invocation and shared by every requested target.
+"""
+import argparse
+import json
+import os
+import time
+from keyterm_corpus import KeyTermCorpus
+from corpus_pack import PackReader, NOTES
+from resource_index import write_resource_index
+from build_manifest import iter_raw_files
+from render_cache import RenderCache, DEFAULT_CACHE_FILE
+from run_table import build_run_table
+from usfm_common import load_backlinks
+import convert_to_usfm as key_terms
+import convert_study_notes_to_usfm as study_notes
+import watch_mode
+import export_daemon
+
+NOTES_DIR = "./json BiblicaStudyNotes/json/"
+KEY_TERMS_DIR = "./json BiblicaStudyNotesKeyTerms/json/"
+OUTPUT_DIR = "./usfm_study_notes/"
+DICTIONARY_FILE = "./BiblicaKeyTerms.sfm"
+KEY_TERMS_MANIFEST = "./.build_manifest_keyterms.json"
+STUDY_NOTES_MANIFEST = "./usfm_study_notes/.build_manifest.json"
+
+TARGETS = {
+    'keyterms': ('keyterms',),
+    'studynotes': ('studynotes',),
+    'all': ('keyterms', 'studynotes'),
+}
+
+def run_targets(targets, pack=None, workers=1, incremental=False, cache_file=DEFAULT_CACHE_FILE, columnar=False,
+                used_in=False):
+    """
+    Run export targets against one shared in-memory corpus.
+
+    Args:
+        targets: Iterable of 'keyterms' and/or 'studynotes'
+        pack: Optional corpus pack to read instead of the JSON directories
+        workers: Number of worker processes for study note conversion
+        incremental: Only re-render what changed since the last incremental build
+        cache_file: SQLite render cache to reuse rendered documents from, or None to render everything
+        columnar: Flatten each collection into a run_table.RunTable and render from its columns
+        used_in: End each dictionary entry with the study note passages that link the term,
+            read from the concordance of the study note build (which then runs first)
+    """
+    pack_reader = PackReader(pack) if pack else None
+    cache = RenderCache(cache_file) if cache_file and not (incremental or columnar) else None
+    try:
+        print("Loading key term corpus...")
+        if pack_reader is not None:
+            corpus = KeyTermCorpus.from_pack(pack_reader)
+        else:
+            corpus = KeyTermCorpus(KEY_TERMS_DIR)
+            write_resource_index(corpus.resource_map, KEY_TERMS_DIR)
+        resource_map = corpus.resource_map
+        print(f"Found {len(resource_map)} key term resources")
+
+        if used_in:
+            # "Used in" lists come from the lookup files the study note build writes
+            targets = sorted(targets, key=lambda target: target != 'studynotes')
+        for target in targets:
+            start = time.perf_counter()
+            if target == 'keyterms':
+                backlinks = None
+                if used_in:
+                    backlinks = load_backlinks(OUTPUT_DIR)
+                    if backlinks is None:
+                        print(f"Error: Study note concordance or verse index missing in {OUTPUT_DIR}; "
+                              "build the studynotes target first")
+                        continue
+                    print(f"Found study note links to {len(backlinks)} key terms")
+                if incremental:
+                    key_terms.build_incremental(corpus.raw_documents, resource_map, DICTIONARY_FILE, KEY_TERMS_MANIFEST)
+                elif columnar:
+                    key_terms.convert_key_terms_from_runs(build_run_table(corpus.documents), resource_map, DICTIONARY_FILE)
+                elif cache is not None:
+                    key_terms.convert_key_terms_cached(corpus.raw_documents, resource_map, DICTIONARY_FILE, cache,
+                                                       backlinks)
+                else:
+                    key_terms.convert_key_terms(corpus.documents, resource_map, DICTIONARY_FILE, backlinks)
+            else:
+                os.makedirs(OUTPUT_DIR, exist_ok=True)
+                if incremental:
+                    raw_documents = (pack_reader.iter_raw(NOTES) if pack_reader is not None
+                                     else iter_raw_files(NOTES_DIR))
+                    study_notes.build_incremental(raw_documents, resource_map, OUTPUT_DIR, STUDY_NOTES_MANIFEST)
+                elif columnar:
+                    documents = (pack_reader.documents(NOTES) if pack_reader is not None
+                                 else study_notes.load_study_notes(NOTES_DIR))
+                    study_notes.convert_study_notes_from_runs(build_run_table(documents), resource_map, OUTPUT_DIR)
+                elif cache is not None:
+                    raw_documents = (pack_reader.iter_raw(NOTES) if pack_reader is not None
+                                     else iter_raw_files(NOTES_DIR))
+                    study_notes.convert_study_notes_cached(raw_documents, resource_map, OUTPUT_DIR, cache, workers)
+                else:
+                    documents = (pack_reader.documents(NOTES) if pack_reader is not None
+                                 else study_notes.load_study_notes(NOTES_DIR))
+                    study_notes.convert_study_notes(documents, resource_map, OUTPUT_DIR, workers)
+            print(f"Target {target} finished in {time.perf_counter() - start:.2f}s")
+    finally:
+        if cache is not None:
+            cache.close()
+        if pack_reader is not None:
+            pack_reader.close()
+
+def main():
+    parser = argparse.ArgumentParser(prog="biblionexus-export",
+                                     description="Export BiblioNexus JSON to USFM.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--pack", help="Read documents from a corpus pack instead of the JSON directories")
+    common.add_argument("--workers", type=int, default=1, help="Number of worker processes for study notes")
+    common.add_argument("--incremental", action="store_true",
+                        help="Only re-render documents changed since the last incremental build")
+    common.add_argument("--no-cache", action="store_true", help="Render every document instead of using the render cache")
+    common.add_argument("--cache-file", default=DEFAULT_CACHE_FILE, help="SQLite render cache")
+    common.add_argument("--columnar", action="store_true",
+                        help="Flatten documents into a columnar run table and render from it")
+    common.add_argument("--used-in", action="store_true",
+                        help="End each key term entry with the study note passages that link the term")
+    subparsers.add_parser("keyterms", parents=[common], help="Build the key term dictionary")
+    subparsers.add_parser("studynotes", parents=[common], help="Build the per-book study note files")
+    subparsers.add_parser("all", parents=[common], help="Build every target from one loaded corpus")
+
+    watch_parser = subparsers.add_parser("watch", help="Regenerate outputs as the JSON inputs change")
+    watch_parser.add_argument("--interval", type=float, default=0.1, help="Polling interval in seconds")
+
+    daemon_parser = subparsers.add_parser("daemon", help="Serve rebuild requests over a Unix socket")
+    daemon_parser.add_argument("--socket", default=export_daemon.DEFAULT_SOCKET, help="Unix socket path")
+    daemon_parser.add_argument("--interval", type=float, default=1.0, help="Seconds between input scans while idle")
+
+    client_parser = subparsers.add_parser("client", help="Send a request to a running daemon")
+    client_parser.add_argument("--socket", default=export_daemon.DEFAULT_SOCKET, help="Unix socket path")
+    client_parser.add_argument("request", choices=["rebuild", "ping", "shutdown"])
+    client_parser.add_argument("target", nargs="?", choices=["book", "term", "all"])
+    client_parser.add_argument("name", nargs="?", help="Book ID/name or key term name/referenceId")
+
+    args = parser.parse_args()
+
+    if args.command == 'daemon':
+        export_daemon.serve(args.socket, args.interval)
+        return
+    if args.command == 'client':
+        request = export_daemon.request_from_args(args.request, args.target, args.name)
+        response = export_daemon.send_request(request, args.socket)
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+        if not response.get('ok'):
+            raise SystemExit(1)
+        return
+
+    if args.command == 'watch':
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        state = watch_mode.ExportState(NOTES_DIR, KEY_TERMS_DIR, OUTPUT_DIR, DICTIONARY_FILE)
+        print("Loading corpus...")
+        state.refresh()
+        watch_mode.watch(state, args.interval)
+        return
+
+    if args.used_in and (args.incremental or args.columnar):
+        parser.error("--used-in cannot be combined with --incremental or --columnar")
+
+    start = time.perf_counter()
+    run_targets(TARGETS[args.command], args.pack, args.workers, args.incremental,
+                None if args.no_cache else args.cache_file, args.columnar, args.used_in)
+    print(f"Export complete in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Content-hash build manifest for incremental USFM rebuilds.
+
+The manifest records, for every input document, the hash of its JSON bytes,
+the output file it contributes to, the key term resourceIds it references
+and its rendered result. It also keeps the resource map the inputs were
+rendered against and the hash of every output file written. On a rerun only
+inputs whose hash changed, or that reference a key term that was added,
+removed or renamed, are re-rendered, and only the outputs they feed (or
+outputs that are missing or were edited by hand) are rewritten.
+"""
+import glob
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 4
+
+def content_hash(raw):
+    """
+    Return the hex SHA-256 digest of bytes or text.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+def referenced_resources(tiptap_content):
+    """
+    Collect the resourceIds of every resourceReference mark in a TipTap tree.
+
+    Args:
+        tiptap_content: A TipTap node, or a list of nodes
+
+    Returns:
+        Sorted list of resourceId strings
+    """
+    resources = set()
+    stack = [tiptap_content]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            for mark in node.get('marks', []):
+                if mark.get('type') == 'resourceReference':
+                    resource_id = mark.get('attrs', {}).get('resourceId')
+                    if resource_id is not None:
+                        resources.add(str(resource_id))
+            stack.extend(node.get('content', []))
+    return sorted(resources)
+
+def iter_raw_files(json_dir):
+    """
+    Yield (filename, JSON bytes) for every JSON file in a directory, sorted by filename.
+    """
+    for json_file in sorted(glob.glob(os.path.join(json_dir, "*.json"))):
+        with open(json_file, 'rb') as f:
+            yield os.path.basename(json_file), f.read()
+
+class BuildManifest:
+    """
+    Persistent record of input hashes, dependencies and output hashes.
+
+    Attributes:
+        path: Where the manifest is stored
+        inputs: filename -> {'hash', 'output', 'resources', 'result'}
+        resources: The resource map the recorded results were rendered against
+        outputs: output file -> hash of the content last written there
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.inputs = {}
+        self.resources = {}
+        self.outputs = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Ignoring unreadable build manifest {path}: {e}")
+            return
+        if data.get('version') != MANIFEST_VERSION:
+            return
+        self.inputs = data.get('inputs', {})
+        self.resources = data.get('resources', {})
+        self.outputs = data.get('outputs', {})
+
+    def changed_resources(self, resource_map):
+        """
+        Return the resourceIds added, removed or renamed since the last build.
+        """
+        changed = set(self.resources.keys() ^ resource_map.keys())
+        for resource_id, name in resource_map.items():
+            if resource_id in self.resources and self.resources[resource_id] != name:
+                changed.add(resource_id)
+        return changed
+
+    def is_fresh(self, filename, digest, changed_resources):
+        """
+        Check whether the recorded result for an input can be reused.
+        """
+        entry = self.inputs.get(filename)
+        if entry is None or entry['hash'] != digest:
+            return False
+        return not changed_resources.intersection(entry['resources'])
+
+    def record(self, filename, digest, output, resources, result):
+        """
+        Record the rendered result of an input and what it depends on.
+        """
+        self.inputs[filename] = {
+            'hash': digest,
+            'output': output,
+            'resources': resources,
+            'result': result,
+        }
+
+    def forget(self, filename):
+        """
+        Drop an input that no longer exists, returning its recorded entry.
+        """
+        return self.inputs.pop(filename, None)
+
+    def output_is_current(self, output_file):
+        """
+        Check that an output exists and still holds what was last written to it.
+        """
+        expected = self.outputs.get(output_file)
+        if expected is None:
+            return False
+        try:
+            with open(output_file, 'rb') as f:
+                return content_hash(f.read()) == expected
+        except OSError:
+            return False
+
+    def record_output(self, output_file, content):
+        self.outputs[output_file] = content_hash(content)
+
+    def save(self, resource_map):
+        """
+        Write the manifest, recording the resource map the build used.
+        """
+        self.resources = dict(resource_map)
+        tmp_file = self.path + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'inputs': self.inputs,
+                'resources': self.resources,
+                'outputs': self.outputs,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_file, self.path)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Key term concordance: where each key term is linked from the study notes.
+
+Every resourceReference mark in a study note becomes an occurrence:
+
+    note_id     the number at the end of the note's filename
+    paragraph   index of the enclosing paragraph within the note, or -1
+    offset      character offset of the run within that paragraph's text
+    text        the linked run's text as it appears in the note
+
+The study note conversion collects each note's occurrences in the same walk
+that renders it (record_occurrences wraps the runs handed to the renderer)
+and writes the concordance next to the book files. Occurrences are grouped
+by resourceId and sorted, and each group is stored as one run of unsigned
+LEB128 varints, four per occurrence:
+- the note ID, as a delta from the previous occurrence;
+- the paragraph, as a delta when the note is unchanged;
+- the offset, as a delta when the paragraph is unchanged;
+- a code into a table of distinct surface texts.
+A query decodes only the group it asks for.
+
+Run from the repository root to look up a term by name or resourceId:
+
+    python concordance.py covenant
+"""
+import argparse
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from tiptap_ast import iter_runs, resource_reference
+
+MAGIC = b'BNXCONC1'
+CONCORDANCE_FILENAME = "concordance.idx"
+DEFAULT_CONCORDANCE_FILE = os.path.join("./usfm_study_notes/", CONCORDANCE_FILENAME)
+KEY_TERMS_DIR = "./json BiblicaStudyNotesKeyTerms/json/"
+
+_HEADER = struct.Struct('<8sIIIII')
+
+Occurrence = namedtuple('Occurrence', ['note_id', 'paragraph', 'offset', 'text'])
+
+def default_concordance_path(output_dir):
+    """
+    Return the concordance path for a study note output directory.
+    """
+    return os.path.join(output_dir, CONCORDANCE_FILENAME)
+
+def record_occurrences(runs, occurrences):
+    """
+    Pass a note's text runs through, noting each key term link on the way.
+
+    Wrapping the runs handed to the renderer collects a note's occurrences in
+    the same walk that renders it.
+
+    Args:
+        runs: Iterable of (paragraph, text, marks) in document order, as from tiptap_ast.iter_runs
+        occurrences: List the (resource_id, paragraph, offset, text) tuples are appended to
+
+    Yields:
+        (text, marks) for every run, as TiptapRenderer.render_runs expects
+    """
+    current = None
+    offset = 0
+    for paragraph, text, marks in runs:
+        if paragraph != current:
+            current = paragraph
+            offset = 0
+        if marks:
+            resource_id = resource_reference(marks)
+            if resource_id is not None:
+                occurrences.append((resource_id, paragraph, offset, text))
+        offset += len(text)
+        yield text, marks
+
+def note_occurrences(data):
+    """
+    Return the concordance occurrences of a decoded study note, without rendering it.
+
+    Returns:
+        List of (resource_id, paragraph, offset, text) tuples
+    """
+    occurrences = []
+    for _ in record_occurrences(iter_runs([item.tiptap for item in data.content]), occurrences):
+        pass
+    return occurrences
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data, position):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+def _string_table(strings):
+    offsets = array('I', [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode('utf-8')
+        offsets.append(len(blob))
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return offsets.tobytes(), bytes(blob)
+
+def write_concordance(notes, concordance_file):
+    """
+    Write the concordance of a set of study notes.
+
+    Args:
+        notes: Iterable of (note_id, occurrences) tuples, where occurrences
+            are (resource_id, paragraph, offset, text) tuples
+        concordance_file: Where to write the concordance
+
+    Returns:
+        The number of occurrences written
+    """
+    by_resource = defaultdict(list)
+    for note_id, occurrences in notes:
+        for resource_id, paragraph, offset, text in occurrences:
+            by_resource[resource_id].append((note_id, paragraph, offset, text))
+
+    resource_ids = sorted(by_resource)
+    text_codes = {}
+    stream = bytearray()
+    stream_offsets = array('I', [0])
+    total = 0
+    for resource_id in resource_ids:
+        previous_note = previous_paragraph = previous_offset = 0
+        for note_id, paragraph, offset, text in sorted(by_resource[resource_id]):
+            if note_id != previous_note:
+                previous_paragraph = previous_offset = 0
+            elif paragraph + 1 != previous_paragraph:
+                previous_offset = 0
+            # Paragraph -1 (text outside any paragraph) is stored as 0, shifting the rest up by one
+            _write_varint(stream, note_id - previous_note)
+            _write_varint(stream, paragraph + 1 - previous_paragraph)
+            _write_varint(stream, offset - previous_offset)
+            _write_varint(stream, text_codes.setdefault(text, len(text_codes)))
+            previous_note, previous_paragraph, previous_offset = note_id, paragraph + 1, offset
+            total += 1
+        stream_offsets.append(len(stream))
+    if sys.byteorder != 'little':
+        stream_offsets.byteswap()
+
+    id_offsets, id_blob = _string_table(resource_ids)
+    text_offsets, text_blob = _string_table(text_codes)
+
+    tmp_file = concordance_file + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(resource_ids), len(text_codes), len(id_blob), len(text_blob), len(stream)))
+        f.write(stream_offsets.tobytes())
+        f.write(id_offsets)
+        f.write(text_offsets)
+        f.write(id_blob)
+        f.write(text_blob)
+        f.write(stream)
+    os.replace(tmp_file, concordance_file)
+    return total
+
+def read_concordance(concordance_file=DEFAULT_CONCORDANCE_FILE):
+    """
+    Read a concordance written by write_concordance.
+
+    Returns:
+        A Concordance, or None if the file is missing or malformed
+    """
+    try:
+        with open(concordance_file, 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return None
+
+    if len(raw) < _HEADER.size:
+        return None
+    magic, resource_count, text_count, ids_size, texts_size, stream_size = _HEADER.unpack_from(raw, 0)
+    if magic != MAGIC:
+        return None
+
+    position = _HEADER.size
+    sections = []
+    for size in (4 * (resource_count + 1), 4 * (resource_count + 1), 4 * (text_count + 1),
+                 ids_size, texts_size, stream_size):
+        sections.append(raw[position:position + size])
+        position += size
+    if position != len(raw):
+        return None
+
+    stream_offsets, id_offsets, text_offsets = (array('I', section) for section in sections[:3])
+    if sys.byteorder != 'little':
+        for offsets in (stream_offsets, id_offsets, text_offsets):
+            offsets.byteswap()
+
+    def strings(offsets, blob):
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+    return Concordance(strings(id_offsets, sections[3]), strings(text_offsets, sections[4]),
+                       stream_offsets, sections[5])
+
+class Concordance:
+    """
+    Query the key term occurrences recorded by write_concordance.
+
+    Attributes:
+        resource_ids: The resourceIds with at least one occurrence, sorted
+        texts: Distinct surface texts, by text code
+    """
+
+    def __init__(self, resource_ids, texts, stream_offsets, stream):
+        self.resource_ids = resource_ids
+        self.texts = texts
+        self._stream_offsets = stream_offsets
+        self._stream = stream
+
+    def __len__(self):
+        return len(self.resource_ids)
+
+    def __contains__(self, resource_id):
+        return self._position(resource_id) is not None
+
+    def _position(self, resource_id):
+        i = bisect_left(self.resource_ids, resource_id)
+        if i < len(self.resource_ids) and self.resource_ids[i] == resource_id:
+            return i
+        return None
+
+    def occurrences(self, resource_id):
+        """
+        Return every occurrence of a key term.
+
+        Args:
+            resource_id: The key term's resourceId
+
+        Returns:
+            List of Occurrence tuples ordered by note, paragraph and offset
+            (empty if the term is never linked)
+        """
+        i = self._position(str(resource_id))
+        if i is None:
+            return []
+        stream = self._stream
+        texts = self.texts
+        position = self._stream_offsets[i]
+        end = self._stream_offsets[i + 1]
+        note_id = paragraph = offset = 0
+        occurrences = []
+        while position < end:
+            note_delta, position = _read_varint(stream, position)
+            paragraph_delta, position = _read_varint(stream, position)
+            offset_delta, position = _read_varint(stream, position)
+            text_code, position = _read_varint(stream, position)
+            if note_delta:
+                paragraph = offset = 0
+            elif paragraph_delta:
+                offset = 0
+            note_id += note_delta
+            paragraph += paragraph_delta
+            offset += offset_delta
+            occurrences.append(Occurrence(note_id, paragraph - 1, offset, texts[text_code]))
+        return occurrences
+
+    def notes(self, resource_id):
+        """
+        Return the sorted IDs of the notes that link a key term.
+        """
+        return sorted({occurrence.note_id for occurrence in self.occurrences(resource_id)})
+
+def find_resource_ids(resource_map, term):
+    """
+    Return the resourceIds a CLI argument refers to: itself if it is one, else every term of that name.
+    """
+    if term in resource_map:
+        return [term]
+    term = term.lower()
+    return sorted(resource_id for resource_id, name in resource_map.items() if name.lower() == term)
+
+def main():
+    # Imported here so the query API does not load the key term corpus
+    from resource_index import load_resource_map
+    from verse_index import format_passage, read_verse_index
+    from verse_table import note_id
+
+    parser = argparse.ArgumentParser(description="Show where key terms are linked from the study notes.")
+    parser.add_argument("terms", nargs="+", help="Key term names or resourceIds")
+    parser.add_argument("--concordance", default=DEFAULT_CONCORDANCE_FILE,
+                        help="Concordance written by the study note conversion")
+    args = parser.parse_args()
+
+    concordance = read_concordance(args.concordance)
+    if concordance is None:
+        sys.exit(f"Concordance {args.concordance} missing or unreadable; run convert_study_notes_to_usfm.py first")
+    resource_map = load_resource_map(KEY_TERMS_DIR)
+
+    # Name notes by their passage when the verse index is available
+    passages = {}
+    index = read_verse_index(os.path.join(os.path.dirname(args.concordance), "verse_index.idx"))
+    if index is not None:
+        for i in range(len(index)):
+            entry = index.entry(i)
+            passages[note_id(entry.filename)] = format_passage(entry.start_key, entry.end_key)
+
+    for term in args.terms:
+        resource_ids = find_resource_ids(resource_map, term)
+        if not resource_ids:
+            print(f"Error: Unknown key term '{term}'")
+            continue
+        for resource_id in resource_ids:
+            occurrences = concordance.occurrences(resource_id)
+            print(f"{resource_map[resource_id]} ({resource_id}): {len(occurrences)} occurrences")
+            for occurrence in occurrences:
+                where = passages.get(occurrence.note_id, str(occurrence.note_id))
+                print(f"  {where} ¶{occurrence.paragraph} @{occurrence.offset}: {occurrence.text}")
+
+if __name__ == "__main__":
+    main()
@@ -1,126 +1,24 @@
 #!/usr/bin/env python3
-import json
+import argparse
+import io
 import os
-import re
-from pathlib import Path
 import glob
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from json_backend import load_document, decode_document
+from tiptap_render import get_renderer
 from collections import defaultdict
-
-def extract_text_from_tiptap(tiptap_content, resource_map=None):
-    """
-    Extract text from TipTap JSON structure.
-    Handles resource references by converting them to USFM key term references.
-    
-    Args:
-        tiptap_content: The TipTap content to process
-        resource_map: A dictionary mapping resourceId to term names
-    """
-    # Handle the case where tiptap_content is a dictionary with 'type' and 'content' keys
-    if isinstance(tiptap_content, dict):
-        # If it's a text node
-        if 'text' in tiptap_content:
-            text = tiptap_content['text']
-            
-            # Check if it has resource reference marks
-            if 'marks' in tiptap_content:
-                for mark in tiptap_content.get('marks', []):
-                    if mark.get('type') == 'resourceReference':
-                        resource_id = mark.get('attrs', {}).get('resourceId')
-                        if resource_map and resource_id in resource_map:
-                            # Format as a USFM key term reference
-                            return f"\\k {text}\\k*"
-            
-            # Regular text node without marks
-            return text
-        
-        # If it has child content
-        if 'content' in tiptap_content:
-            result = ""
-            for item in tiptap_content['content']:
-                result += extract_text_from_tiptap(item, resource_map)
-            return result
-    
-    # Handle the case where tiptap_content is a list of nodes
-    elif isinstance(tiptap_content, list):
-        result = ""
-        for item in tiptap_content:
-            result += extract_text_from_tiptap(item, resource_map)
-        return result
-    
-    return ""
-
-def format_scripture_references(text):
-    """
-    Find and format Scripture references in the text.
-    
-    Args:
-        text: The text to process
-    
-    Returns:
-        Text with Scripture references formatted as USFM cross-references
-    """
-    # List of Bible book names
-    bible_books = [
-        "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy",
-        "Joshua", "Judges", "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings",
-        "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah", "Esther", "Job",
-        "Psalm", "Psalms", "Proverbs", "Ecclesiastes", "Song of Solomon", "Song of Songs",
-        "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel", "Hosea", "Joel",
-        "Amos", "Obadiah", "Jonah", "Micah", "Nahum", "Habakkuk", "Zephaniah", "Haggai",
-        "Zechariah", "Malachi", "Matthew", "Mark", "Luke", "John", "Acts", "Romans",
-        "1 Corinthians", "2 Corinthians", "Galatians", "Ephesians", "Philippians",
-        "Colossians", "1 Thessalonians", "2 Thessalonians", "1 Timothy", "2 Timothy",
-        "Titus", "Philemon", "Hebrews", "James", "1 Peter", "2 Peter", "1 John", "2 John",
-        "3 John", "Jude", "Revelation"
-    ]
-    
-    # Process specific cases manually
-    text = text.replace("Exodus 3:14", "\\xt Exodus 3:14\\xt*")
-    text = text.replace("Luke 8:31", "\\xt Luke 8:31\\xt*")
-    text = text.replace("Psalm 95", "\\xt Psalm 95\\xt*")
-    text = text.replace("Acts 25-26", "\\xt Acts 25-26\\xt*")
-    text = text.replace("Judges 5", "\\xt Judges 5\\xt*")
-    text = text.replace("Zechariah 8", "\\xt Zechariah 8\\xt*")
-    text = text.replace("Exodus 34:6", "\\xt Exodus 34:6\\xt*")
-    
-    # Handle "Genesis chapter 2" format
-    for book in bible_books:
-        pattern = f"{book} chapter (\\d+)"
-        text = re.sub(pattern, f"\\\\xt {book} \\1\\\\xt*", text)
-    
-    # Handle "Hebrews chapters 3 and 4" format
-    for book in bible_books:
-        pattern = f"{book} chapters (\\d+) and (\\d+)"
-        text = re.sub(pattern, f"\\\\xt {book} \\1-\\2\\\\xt*", text)
-    
-    # Handle "book of Judges" format
-    for book in bible_books:
-        pattern = f"book of {book}"
-        text = re.sub(pattern, f"book of \\\\xt {book}\\\\xt*", text)
-    
-    return text
-
-def build_resource_map(json_dir):
-    """
-    Build a mapping of resourceId to term names.
-    """
-    resource_map = {}
-    json_files = glob.glob(os.path.join(json_dir, "*.json"))
-    
-    print(f"Found {len(json_files)} JSON files for resource map")
-    
-    for json_file in json_files:
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                resource_id = str(data.get('referenceId', ''))
-                term_name = data.get('name', '')
-                if resource_id and term_name:
-                    resource_map[resource_id] = term_name
-        except Exception as e:
-            print(f"Error processing {json_file} for resource map: {e}")
-    
-    return resource_map
+from keyterm_corpus import KeyTermCorpus
+from corpus_pack import PackReader, NOTES
+from resource_index import load_resource_map
+from dump_stream import iter_dump_documents, resource_map_from_dump, STUDY_NOTES_GROUPING
+from build_manifest import BuildManifest, content_hash, iter_raw_files, referenced_resources
+from render_cache import RenderCache, DEFAULT_CACHE_FILE, resource_map_hash
+from scripture_refs import BOOK_NAMES, BOOK_IDS, parse_passage_filename, parse_reference
+from verse_index import write_verse_index, default_index_path
+from verse_table import write_verse_table, default_table_path, note_id
+from concordance import write_concordance, default_concordance_path, record_occurrences
+from tiptap_ast import iter_runs
 
 def extract_book_and_reference(filename):
     """
@@ -150,6 +48,32 @@ def extract_book_and_reference(filename):
     
     return book_name, reference
 
+def note_passage(filename, name):
+    """
+    Return the book and the verse-key range a study note covers.
+    
+    The passage is parsed once, from the filename when it names one and from
+    the note's name otherwise. Notes are ordered and grouped by the returned
+    (start_key, end_key) pair of BBCCCVVV integers, so "1:2" sorts before
+    "1:10" and comparisons never touch strings.
+    
+    Args:
+        filename: The filename of the note (e.g., 'Matthew_7_1_12_132540.json')
+        name: The note's name (e.g., 'Matthew 7:1–12')
+    
+    Returns:
+        Tuple of (book_name, (start_key, end_key)); notes whose passage cannot
+        be parsed get the key (0, 0) and sort first
+    """
+    reference = parse_passage_filename(filename) or parse_reference(name or "")
+    if reference is None:
+        book_name, _ = extract_book_and_reference(filename)
+        return book_name, (0, 0)
+    return BOOK_NAMES[reference.book - 1], (reference.start_key, reference.end_key)
+
+# USFM book ID of each canonical book name, from the scripture_refs tables
+_BOOK_IDS = dict(zip(BOOK_NAMES, BOOK_IDS))
+
 def get_book_id(book_name):
     """
     Get the USFM book ID for a given book name.
@@ -160,25 +84,7 @@ def get_book_id(book_name):
     Returns:
         The USFM book ID
     """
-    book_ids = {
-        "Genesis": "GEN", "Exodus": "EXO", "Leviticus": "LEV", "Numbers": "NUM", "Deuteronomy": "DEU",
-        "Joshua": "JOS", "Judges": "JDG", "Ruth": "RUT", "1 Samuel": "1SA", "2 Samuel": "2SA",
-        "1 Kings": "1KI", "2 Kings": "2KI", "1 Chronicles": "1CH", "2 Chronicles": "2CH",
-        "Ezra": "EZR", "Nehemiah": "NEH", "Esther": "EST", "Job": "JOB", "Psalms": "PSA",
-        "Proverbs": "PRO", "Ecclesiastes": "ECC", "Song of Solomon": "SNG", "Isaiah": "ISA",
-        "Jeremiah": "JER", "Lamentations": "LAM", "Ezekiel": "EZK", "Daniel": "DAN",
-        "Hosea": "HOS", "Joel": "JOL", "Amos": "AMO", "Obadiah": "OBA", "Jonah": "JON",
-        "Micah": "MIC", "Nahum": "NAM", "Habakkuk": "HAB", "Zephaniah": "ZEP", "Haggai": "HAG",
-        "Zechariah": "ZEC", "Malachi": "MAL", "Matthew": "MAT", "Mark": "MRK", "Luke": "LUK",
-        "John": "JHN", "Acts": "ACT", "Romans": "ROM", "1 Corinthians": "1CO", "2 Corinthians": "2CO",
-        "Galatians": "GAL", "Ephesians": "EPH", "Philippians": "PHP", "Colossians": "COL",
-        "1 Thessalonians": "1TH", "2 Thessalonians": "2TH", "1 Timothy": "1TI", "2 Timothy": "2TI",
-        "Titus": "TIT", "Philemon": "PHM", "Hebrews": "HEB", "James": "JAS", "1 Peter": "1PE",
-        "2 Peter": "2PE", "1 John": "1JN", "2 John": "2JN", "3 John": "3JN", "Jude": "JUD",
-        "Revelation": "REV"
-    }
-    
-    return book_ids.get(book_name, "UNK")
+    return _BOOK_IDS.get(book_name, "UNK")
 
 def process_json_file(file_path, resource_map):
     """
@@ -189,73 +95,160 @@ def process_json_file(file_path, resource_map):
         resource_map: Dictionary mapping resourceId to term names
     
     Returns:
-        Tuple of (book_name, reference, usfm_content)
+        Tuple of (book_name, (start_key, end_key), usfm_content, occurrences)
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # Extract the reference
-    reference = data.get('name', '')
+    data = load_document(file_path)
     
-    # Extract book name and reference from filename
-    book_name, _ = extract_book_and_reference(file_path)
+    return process_document(file_path, data, resource_map)
+
+def process_document(file_path, data, resource_map):
+    """
+    Process a decoded study note document and return the study note in USFM format.
     
-    # Extract content from TipTap format
-    content_text = ""
-    for content_item in data.get('content', []):
-        if 'tiptap' in content_item:
-            tiptap_data = content_item['tiptap']
-            content_text += extract_text_from_tiptap(tiptap_data, resource_map)
+    Args:
+        file_path: Path or filename the document was read from
+        data: The decoded Document
+        resource_map: Dictionary mapping resourceId to term names
     
-    # Format Scripture references
-    content_text = format_scripture_references(content_text)
+    Returns:
+        Tuple of (book_name, (start_key, end_key), usfm_content, occurrences),
+        occurrences being the note's key term links for the concordance
+    """
+    # Book and verse-key range, parsed once from the filename or name
+    book_name, passage = note_passage(file_path, data.name)
     
-    # Format as USFM study note
-    usfm_content = f"\\im \\bd {reference}\\bd* {content_text}\n"
+    out = io.StringIO()
+    occurrences = write_note(out, data, get_renderer(resource_map))
     
-    return book_name, reference, usfm_content
+    return book_name, passage, out.getvalue(), occurrences
 
-def main():
-    # Define input and output paths
-    input_dir = "./json BiblicaStudyNotes/json/"
-    output_dir = "./usfm_study_notes/"
+def write_note(out, data, renderer):
+    """
+    Render a decoded study note as USFM into a text stream.
     
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
+    Args:
+        out: The stream to write to
+        data: The decoded Document
+        renderer: A TiptapRenderer for the current resource map
     
-    # Build resource map from key terms
-    print("Building resource map from key terms...")
-    resource_map = build_resource_map("./json BiblicaStudyNotesKeyTerms/json/")
-    print(f"Found {len(resource_map)} key term resources")
+    Returns:
+        The note's key term concordance occurrences, collected in the same walk
+    """
+    # Format as USFM study note; the renderer formats Scripture references as it writes
+    out.write(note_heading(data.name))
+    occurrences = []
+    runs = iter_runs([content_item.tiptap for content_item in data.content])
+    renderer.render_runs(record_occurrences(runs, occurrences), out)
+    out.write("\n")
+    return occurrences
+
+def note_heading(name):
+    """
+    Return the USFM that opens a study note.
+    """
+    return f"\\im \\bd {name}\\bd* "
+
+def load_study_notes(input_dir):
+    """
+    Decode every study note in a JSON directory.
     
-    # Get all JSON files in the input directory
+    Returns:
+        List of (file_path, Document) tuples sorted by file path
+    """
     json_files = glob.glob(os.path.join(input_dir, "*.json"))
     print(f"Found {len(json_files)} study note JSON files to process")
     
-    # Group study notes by book
-    book_notes = defaultdict(list)
-    
-    # Process each JSON file
-    for i, json_file in enumerate(sorted(json_files)):
+    documents = []
+    for json_file in sorted(json_files):
         try:
-            if i % 10 == 0:
-                print(f"Processing file {i+1}/{len(json_files)}")
-            
-            book_name, reference, usfm_content = process_json_file(json_file, resource_map)
-            book_notes[book_name].append((reference, usfm_content))
+            documents.append((json_file, load_document(json_file)))
         except Exception as e:
             print(f"Error processing {json_file}: {e}")
+    return documents
+
+# Resource map installed once per worker process by _init_worker
+_worker_resource_map = None
+
+def _init_worker(resource_map):
+    global _worker_resource_map
+    _worker_resource_map = resource_map
+
+def _convert_in_worker(item):
+    json_file, data = item
+    try:
+        return json_file, process_document(json_file, data, _worker_resource_map), None
+    except Exception as e:
+        return json_file, None, str(e)
+
+def convert_documents(documents, resource_map, workers=1, batch_size=256):
+    """
+    Convert study notes, optionally spread across a process pool.
     
-    # Create USFM files for each book
-    for book_name, notes in book_notes.items():
-        book_id = get_book_id(book_name)
-        output_file = os.path.join(output_dir, f"{book_id}_StudyNotes.SFM")
-        
-        # Sort notes by reference
-        notes.sort()
-        
-        # Create USFM header with license information
-        usfm_content = f"""\\id {book_id} - Biblica Study Notes
+    Results are yielded in input order whatever the number of workers, so the
+    grouped output is identical to a serial run. Documents are submitted in
+    batches so a streamed input is never fully materialized.
+    
+    Args:
+        documents: Iterable of (file_path, Document) tuples
+        resource_map: Dictionary mapping resourceId to term names
+        workers: Number of worker processes (1 converts in this process)
+        batch_size: Documents submitted to the pool per worker at a time
+    
+    Yields:
+        Tuples of (file_path, process_document result or None, error message or None)
+    """
+    if workers <= 1:
+        for json_file, data in documents:
+            try:
+                yield json_file, process_document(json_file, data, resource_map), None
+            except Exception as e:
+                yield json_file, None, str(e)
+        return
+    
+    documents = iter(documents)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(resource_map,)) as executor:
+        while True:
+            batch = list(itertools.islice(documents, batch_size * workers))
+            if not batch:
+                break
+            yield from executor.map(_convert_in_worker, batch, chunksize=max(1, len(batch) // (workers * 4)))
+
+def book_output_path(output_dir, book_name):
+    """
+    Return the USFM file a book's study notes are written to.
+    """
+    return os.path.join(output_dir, f"{get_book_id(book_name)}_StudyNotes.SFM")
+
+def render_book(book_name, notes):
+    """
+    Render the USFM file content for one book.
+    
+    Args:
+        book_name: The name of the book
+        notes: List of ((start_key, end_key), usfm_content) tuples, in any order
+    
+    Returns:
+        The USFM file content
+    """
+    # Sort notes by verse keys; notes covering the same passage by their text
+    notes = sorted(notes)
+    
+    usfm_content = book_header(book_name)
+    
+    # Add all notes for this book
+    for _, note_content in notes:
+        usfm_content += note_content
+    
+    return usfm_content
+
+def book_header(book_name):
+    """
+    Return the USFM header, with license information, for one book's study notes.
+    """
+    book_id = get_book_id(book_name)
+    
+    return f"""\\id {book_id} - Biblica Study Notes
 \\rem Copyright © 2023 by Biblica, Inc.
 \\h {book_name} Study Notes
 \\toc1 {book_name} Study Notes
@@ -271,18 +264,408 @@ def main():
 \\pc https://creativecommons.org/licenses/by-sa/4.0/legalcode.en
 
 """
+
+def write_book(output_dir, book_name, notes):
+    """
+    Render and write the USFM file for one book.
+    
+    Returns:
+        Tuple of (output_file, usfm_content)
+    """
+    output_file = book_output_path(output_dir, book_name)
+    usfm_content = render_book(book_name, notes)
+    
+    # Write the USFM content to the output file
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(usfm_content)
+    
+    print(f"Created {output_file} with {len(notes)} study notes")
+    return output_file, usfm_content
+
+def write_note_index(output_dir, notes):
+    """
+    Write the verse index, per-verse table and key term concordance of the converted notes next to the book files.
+    
+    Args:
+        output_dir: Directory the book files are written to
+        notes: Iterable of ((start_key, end_key), file_path, occurrences) tuples,
+            with occurrences as returned by concordance.note_occurrences
+    
+    Returns:
+        List of the files written
+    """
+    notes = list(notes)
+    passages = [(passage, json_file) for passage, json_file, _ in notes]
+    written = []
+    index_file = default_index_path(output_dir)
+    try:
+        count = write_verse_index(passages, index_file)
+        written.append(index_file)
+        print(f"Verse index of {count} study notes written to {index_file}")
+    except OSError as e:
+        print(f"Error writing verse index {index_file}: {e}")
+    
+    table_file = default_table_path(output_dir)
+    try:
+        count = write_verse_table(passages, table_file)
+        written.append(table_file)
+        print(f"Verse table with {count} verse-note entries written to {table_file}")
+    except OSError as e:
+        print(f"Error writing verse table {table_file}: {e}")
+    
+    concordance_file = default_concordance_path(output_dir)
+    try:
+        count = write_concordance(((note_id(json_file), occurrences) for _, json_file, occurrences in notes
+                                   if note_id(json_file) is not None), concordance_file)
+        written.append(concordance_file)
+        print(f"Concordance of {count} key term links written to {concordance_file}")
+    except OSError as e:
+        print(f"Error writing concordance {concordance_file}: {e}")
+    return written
+
+def convert_study_notes(documents, resource_map, output_dir, workers=1):
+    """
+    Render study note documents into one USFM file per book.
+    
+    Serial conversion of documents already held in memory streams each book
+    straight into its file; worker pools and streamed input render each note
+    to a string and assemble the books afterwards.
+    
+    Args:
+        documents: List or iterable of (file_path, Document) tuples
+        resource_map: Dictionary mapping resourceId to term names
+        output_dir: Directory the book files are written to
+        workers: Number of worker processes for conversion
+    """
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    
+    if workers <= 1 and isinstance(documents, list):
+        # Documents already in memory are grouped by book and rendered straight into each file
+        book_documents = defaultdict(list)
+        for i, (json_file, data) in enumerate(documents):
+            if i % 10 == 0:
+                print(f"Processing file {i+1}")
+            try:
+                book_name, passage = note_passage(json_file, data.name)
+            except Exception as e:
+                print(f"Error processing {json_file}: {e}")
+                continue
+            book_documents[book_name].append((passage, json_file, data))
         
-        # Add all notes for this book
-        for _, note_content in notes:
-            usfm_content += note_content
+        renderer = get_renderer(resource_map)
+        passages = []
+        for book_name, book_docs in book_documents.items():
+            passages.extend(stream_book(output_dir, book_name, book_docs, renderer))
+        write_note_index(output_dir, passages)
         
-        # Write the USFM content to the output file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(usfm_content)
+        print(f"Conversion complete. Output written to {output_dir}")
+        return
+    
+    # Group study notes by book
+    book_notes = defaultdict(list)
+    passages = []
+    
+    # Process each JSON file
+    results = convert_documents(documents, resource_map, workers)
+    for i, (json_file, result, error) in enumerate(results):
+        if i % 10 == 0:
+            print(f"Processing file {i+1}")
+        if error is not None:
+            print(f"Error processing {json_file}: {error}")
+            continue
         
-        print(f"Created {output_file} with {len(notes)} study notes")
+        book_name, passage, usfm_content, occurrences = result
+        book_notes[book_name].append((passage, usfm_content))
+        passages.append((passage, json_file, occurrences))
+    
+    # Create USFM files for each book
+    for book_name, notes in book_notes.items():
+        write_book(output_dir, book_name, notes)
+    write_note_index(output_dir, passages)
+    
+    print(f"Conversion complete. Output written to {output_dir}")
+
+def convert_study_notes_cached(raw_documents, resource_map, output_dir, cache, workers=1):
+    """
+    Render study notes into one USFM file per book, reusing cached notes.
+    
+    Notes found in the render cache are used as-is; only the misses are
+    decoded and rendered (across worker processes if requested) and then
+    added to the cache. Each cached note carries its key term concordance
+    entries, so a fully cached run decodes nothing.
+    
+    Args:
+        raw_documents: Iterable of (filename, JSON bytes) tuples
+        resource_map: Dictionary mapping resourceId to term names
+        output_dir: Directory the book files are written to
+        cache: The RenderCache to read and fill
+        workers: Number of worker processes for rendering cache misses
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    map_hash = resource_map_hash(resource_map)
+    book_notes = defaultdict(list)
+    passages = []
+    misses = []
+    keys = {}
+    
+    for i, (filename, raw) in enumerate(raw_documents):
+        if i % 10 == 0:
+            print(f"Processing file {i+1}")
+        key = cache.key('note', filename, raw, map_hash)
+        result = cache.get(key)
+        if result is not None:
+            # JSON hands the verse keys back as a list
+            book_name, passage, usfm_content, occurrences = result
+            book_notes[book_name].append((tuple(passage), usfm_content))
+            passages.append((passage, filename, occurrences))
+            continue
+        try:
+            data = decode_document(raw)
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+            continue
+        misses.append((filename, data))
+        keys[filename] = key
+    
+    for filename, result, error in convert_documents(misses, resource_map, workers):
+        if error is not None:
+            print(f"Error processing {filename}: {error}")
+            continue
+        cache.put(keys[filename], list(result))
+        book_name, passage, usfm_content, occurrences = result
+        book_notes[book_name].append((passage, usfm_content))
+        passages.append((passage, filename, occurrences))
+    
+    for book_name, notes in book_notes.items():
+        write_book(output_dir, book_name, notes)
+    write_note_index(output_dir, passages)
+    
+    print(f"Conversion complete. Output written to {output_dir}")
+
+def convert_study_notes_from_runs(table, resource_map, output_dir):
+    """
+    Render the study notes flattened into a run_table.RunTable into one USFM file per book.
+    
+    Args:
+        table: RunTable holding one document per study note
+        resource_map: Dictionary mapping resourceId to term names
+        output_dir: Directory the book files are written to
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    renderer = get_renderer(resource_map)
+    book_notes = defaultdict(list)
+    passages = []
+    for doc_id, json_file in enumerate(table.filenames):
+        try:
+            book_name, passage = note_passage(json_file, table.names[doc_id])
+            out = io.StringIO()
+            occurrences = []
+            out.write(note_heading(table.names[doc_id]))
+            renderer.render_runs(record_occurrences(table.iter_paragraph_runs(doc_id), occurrences), out)
+            out.write("\n")
+        except Exception as e:
+            print(f"Error processing {json_file}: {e}")
+            continue
+        book_notes[book_name].append((passage, out.getvalue()))
+        passages.append((passage, json_file, occurrences))
+    
+    for book_name, notes in book_notes.items():
+        write_book(output_dir, book_name, notes)
+    write_note_index(output_dir, passages)
     
     print(f"Conversion complete. Output written to {output_dir}")
 
+def stream_book(output_dir, book_name, documents, renderer):
+    """
+    Render one book's study notes straight into its buffered output file.
+    
+    Notes are written in the same order as render_book: by verse keys, with
+    notes covering the same passage ordered by their rendered text.
+    
+    Args:
+        output_dir: Directory the book files are written to
+        book_name: The name of the book
+        documents: List of ((start_key, end_key), file_path, Document) tuples for this book
+        renderer: A TiptapRenderer for the current resource map
+    
+    Returns:
+        List of ((start_key, end_key), file_path, occurrences) tuples for the notes written
+    """
+    output_file = book_output_path(output_dir, book_name)
+    by_passage = defaultdict(list)
+    for passage, json_file, data in documents:
+        by_passage[passage].append((json_file, data))
+    
+    written = []
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(book_header(book_name))
+        for passage in sorted(by_passage):
+            notes = by_passage[passage]
+            if len(notes) > 1:
+                rendered = []
+                for json_file, data in notes:
+                    try:
+                        out = io.StringIO()
+                        occurrences = write_note(out, data, renderer)
+                        rendered.append(out.getvalue())
+                        written.append((passage, json_file, occurrences))
+                    except Exception as e:
+                        print(f"Error processing {json_file}: {e}")
+                for note_content in sorted(rendered):
+                    f.write(note_content)
+                continue
+            
+            json_file, data = notes[0]
+            start = f.tell()
+            try:
+                occurrences = write_note(f, data, renderer)
+                written.append((passage, json_file, occurrences))
+            except Exception as e:
+                # Drop whatever part of the note was written before the failure
+                f.seek(start)
+                f.truncate()
+                print(f"Error processing {json_file}: {e}")
+    
+    print(f"Created {output_file} with {len(written)} study notes")
+    return written
+
+def build_incremental(raw_documents, resource_map, output_dir, manifest_file):
+    """
+    Rebuild only the study notes and books affected by changes since the last build.
+    
+    A note is re-rendered when its JSON bytes changed or when it references a
+    key term that was added, removed or renamed. A book is rewritten when any
+    of its notes changed, or when its file is missing or no longer matches
+    what was last written.
+    
+    Args:
+        raw_documents: Iterable of (filename, JSON bytes) tuples
+        resource_map: Dictionary mapping resourceId to term names
+        output_dir: Directory the book files are written to
+        manifest_file: Path of the build manifest
+    """
+    manifest = BuildManifest(manifest_file)
+    changed_resources = manifest.changed_resources(resource_map)
+    dirty_books = set()
+    seen = set()
+    rendered = 0
+    
+    for filename, raw in raw_documents:
+        seen.add(filename)
+        digest = content_hash(raw)
+        if manifest.is_fresh(filename, digest, changed_resources):
+            continue
+        
+        previous = manifest.forget(filename)
+        if previous is not None:
+            dirty_books.add(previous['output'])
+        try:
+            data = decode_document(raw)
+            book_name, passage, usfm_content, occurrences = process_document(filename, data, resource_map)
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+            continue
+        
+        resources = referenced_resources([item.tiptap for item in data.content])
+        manifest.record(filename, digest, book_name, resources, [passage, usfm_content, occurrences])
+        dirty_books.add(book_name)
+        rendered += 1
+    
+    # Notes that disappeared still invalidate the book they were in
+    for filename in [name for name in manifest.inputs if name not in seen]:
+        dirty_books.add(manifest.forget(filename)['output'])
+    
+    book_notes = defaultdict(list)
+    passages = []
+    for filename, entry in manifest.inputs.items():
+        passage, usfm_content, occurrences = entry['result']
+        book_notes[entry['output']].append((tuple(passage), usfm_content))
+        passages.append((passage, filename, occurrences))
+    
+    written = 0
+    for book_name, notes in book_notes.items():
+        output_file = book_output_path(output_dir, book_name)
+        if book_name not in dirty_books and manifest.output_is_current(output_file):
+            continue
+        output_file, usfm_content = write_book(output_dir, book_name, notes)
+        manifest.record_output(output_file, usfm_content)
+        written += 1
+    lookups_missing = not all(os.path.exists(path) for path in (default_index_path(output_dir),
+                                                                  default_table_path(output_dir),
+                                                                  default_concordance_path(output_dir)))
+    if written or rendered or lookups_missing:
+        write_note_index(output_dir, passages)
+    
+    manifest.save(resource_map)
+    print(f"Re-rendered {rendered} study notes, rewrote {written} of {len(book_notes)} books")
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Biblica study note JSON to per-book USFM files.")
+    parser.add_argument("--pack", help="Read documents from a corpus pack instead of the JSON directories")
+    parser.add_argument("--dump", help="Stream documents from a JSON array or JSON-lines API dump")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes for conversion")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-render notes and books changed since the last incremental build")
+    parser.add_argument("--manifest", default="./usfm_study_notes/.build_manifest.json",
+                        help="Build manifest used by --incremental")
+    parser.add_argument("--no-cache", action="store_true", help="Render every note instead of using the render cache")
+    parser.add_argument("--cache-file", default=DEFAULT_CACHE_FILE, help="SQLite render cache")
+    args = parser.parse_args()
+    if args.incremental and args.dump:
+        parser.error("--incremental cannot be combined with --dump")
+    
+    # Define input and output paths
+    input_dir = "./json BiblicaStudyNotes/json/"
+    output_dir = "./usfm_study_notes/"
+    
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    
+    if args.incremental:
+        if args.pack:
+            with PackReader(args.pack) as pack:
+                resource_map = KeyTermCorpus.from_pack(pack).resource_map
+                build_incremental(pack.iter_raw(NOTES), resource_map, output_dir, args.manifest)
+        else:
+            resource_map = load_resource_map("./json BiblicaStudyNotesKeyTerms/json/")
+            build_incremental(iter_raw_files(input_dir), resource_map, output_dir, args.manifest)
+        print(f"Conversion complete. Output written to {output_dir}")
+        return
+    
+    if not args.dump and not args.no_cache:
+        # Unchanged notes come straight from the render cache; only misses are decoded
+        with RenderCache(args.cache_file) as cache:
+            if args.pack:
+                with PackReader(args.pack) as pack:
+                    resource_map = KeyTermCorpus.from_pack(pack).resource_map
+                    print(f"Found {len(resource_map)} key term resources")
+                    convert_study_notes_cached(pack.iter_raw(NOTES), resource_map, output_dir, cache, args.workers)
+            else:
+                resource_map = load_resource_map("./json BiblicaStudyNotesKeyTerms/json/")
+                print(f"Found {len(resource_map)} key term resources")
+                convert_study_notes_cached(iter_raw_files(input_dir), resource_map, output_dir, cache, args.workers)
+        return
+    
+    # Build resource map from key terms
+    print("Building resource map from key terms...")
+    if args.dump:
+        # Key terms in the dump win; otherwise fall back to the key term directory
+        resource_map = resource_map_from_dump(args.dump)
+        if not resource_map:
+            resource_map = load_resource_map("./json BiblicaStudyNotesKeyTerms/json/")
+        documents = iter_dump_documents(args.dump, STUDY_NOTES_GROUPING)
+    elif args.pack:
+        with PackReader(args.pack) as pack:
+            resource_map = KeyTermCorpus.from_pack(pack).resource_map
+            documents = pack.documents(NOTES)
+        print(f"Found {len(documents)} study note documents in {args.pack}")
+    else:
+        resource_map = load_resource_map("./json BiblicaStudyNotesKeyTerms/json/")
+        documents = load_study_notes(input_dir)
+    print(f"Found {len(resource_map)} key term resources")
+    
+    convert_study_notes(documents, resource_map, output_dir, args.workers)
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
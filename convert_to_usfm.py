@@ -1,193 +1,340 @@
 #!/usr/bin/env python3
-import json
+import argparse
+import io
 import os
-import re
-from pathlib import Path
-import glob
+import sys
+from json_backend import load_document, decode_document
+from tiptap_render import get_renderer
+from keyterm_corpus import KeyTermCorpus
+from corpus_pack import PackReader
+from resource_index import write_resource_index, load_key_term_inputs
+from dump_stream import iter_dump_documents, resource_map_from_dump, KEY_TERMS_GROUPING
+from build_manifest import BuildManifest, content_hash, referenced_resources
+from render_cache import RenderCache, DEFAULT_CACHE_FILE, resource_map_hash
+from usfm_common import load_backlinks
 
-def extract_text_from_tiptap(tiptap_content, resource_map=None):
+# USFM header with license information
+DICTIONARY_HEADER = """\\id BD
+\\c 1
+\\ms Biblica Key Terms Dictionary
+
+\\periph Copyright Information
+\\mt Biblica Bible Dictionary
+\\pc Copyright © 2023 Biblica, Inc.
+\\pc https://www.biblica.com/
+\\pc Licensed under CC BY-SA 4.0 license
+\\pc https://creativecommons.org/licenses/by-sa/4.0/legalcode.en
+
+"""
+
+def process_json_file(file_path, resource_map):
+    """
+    Process a single JSON file and return a dictionary entry in USFM format.
+    """
+    data = load_document(file_path)
+    
+    return process_document(data, resource_map)
+
+def write_entry(out, data, renderer, backlinks=None):
     """
-    Extract plain text from TipTap JSON structure.
-    Handles resource references by converting them to USFM cross-references.
+    Render a decoded key term document as a USFM dictionary entry into a text stream.
     
     Args:
-        tiptap_content: The TipTap content to process
-        resource_map: A dictionary mapping resourceId to term names
+        out: The stream to write to
+        data: The decoded Document
+        renderer: A TiptapRenderer for the current resource map
+        backlinks: Optional map from usfm_common.load_backlinks; the entry then ends with
+            the study note passages that link the term
     """
-    # Handle the case where tiptap_content is a dictionary with 'type' and 'content' keys
-    if isinstance(tiptap_content, dict):
-        # If it's a text node
-        if 'text' in tiptap_content:
-            text = tiptap_content['text']
-            
-            # Check if it has resource reference marks
-            if 'marks' in tiptap_content:
-                for mark in tiptap_content.get('marks', []):
-                    if mark.get('type') == 'resourceReference':
-                        resource_id = mark.get('attrs', {}).get('resourceId')
-                        if resource_map and resource_id in resource_map:
-                            # Format as a USFM cross-reference using \k tag
-                            return f"\\k {text}\\k*"
-            
-            # Regular text node without marks
-            return text
-        
-        # If it has child content
-        if 'content' in tiptap_content:
-            result = ""
-            for item in tiptap_content['content']:
-                result += extract_text_from_tiptap(item, resource_map)
-            return result
-    
-    # Handle the case where tiptap_content is a list of nodes
-    elif isinstance(tiptap_content, list):
-        result = ""
-        for item in tiptap_content:
-            result += extract_text_from_tiptap(item, resource_map)
-        return result
-    
-    return ""
+    # Format as USFM dictionary entry; the renderer formats Scripture references as it writes
+    out.write(entry_heading(data.name))
+    renderer.render([content_item.tiptap for content_item in data.content], out)
+    if backlinks and data.reference_id is not None:
+        out.write(used_in(backlinks.get(str(data.reference_id))))
+
+def entry_heading(name):
+    """
+    Return the USFM that opens the dictionary entry for a term.
+    """
+    return f"\\p \\k {name}\\k*\\im "
 
-def format_scripture_references(text):
+def used_in(passages):
     """
-    Find and format Scripture references in the text.
+    Return the "Used in" list that ends a dictionary entry, or '' if there are no passages.
+    """
+    if not passages:
+        return ""
+    links = "; ".join(f"\\xt {passage}\\xt*" for passage in passages)
+    return f" (Used in: {links})"
+
+def process_document(data, resource_map, backlinks=None):
+    """
+    Process a decoded key term document and return a dictionary entry in USFM format.
+    """
+    out = io.StringIO()
+    write_entry(out, data, get_renderer(resource_map), backlinks)
+    return out.getvalue()
+
+def render_dictionary(entries):
+    """
+    Render the USFM dictionary from (filename, entry) tuples, ordered by filename.
+    """
+    usfm_content = DICTIONARY_HEADER
+    for _, entry in sorted(entries):
+        usfm_content += entry + "\n"
+    return usfm_content
+
+def convert_key_terms(documents, resource_map, output_file, backlinks=None):
+    """
+    Render key term documents into the USFM dictionary file.
+    
+    Documents already held in memory are rendered in filename order straight
+    into the buffered output file. Streamed documents arrive in dump order, so
+    their entries are rendered individually and sorted before writing.
     
     Args:
-        text: The text to process
-    
-    Returns:
-        Text with Scripture references formatted as USFM cross-references
-    """
-    # List of Bible book names
-    bible_books = [
-        "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy",
-        "Joshua", "Judges", "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings",
-        "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah", "Esther", "Job",
-        "Psalm", "Psalms", "Proverbs", "Ecclesiastes", "Song of Solomon", "Song of Songs",
-        "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel", "Hosea", "Joel",
-        "Amos", "Obadiah", "Jonah", "Micah", "Nahum", "Habakkuk", "Zephaniah", "Haggai",
-        "Zechariah", "Malachi", "Matthew", "Mark", "Luke", "John", "Acts", "Romans",
-        "1 Corinthians", "2 Corinthians", "Galatians", "Ephesians", "Philippians",
-        "Colossians", "1 Thessalonians", "2 Thessalonians", "1 Timothy", "2 Timothy",
-        "Titus", "Philemon", "Hebrews", "James", "1 Peter", "2 Peter", "1 John", "2 John",
-        "3 John", "Jude", "Revelation"
-    ]
-    
-    # Process specific cases manually
-    text = text.replace("Exodus 3:14", "\\xt Exodus 3:14\\xt*")
-    text = text.replace("Luke 8:31", "\\xt Luke 8:31\\xt*")
-    text = text.replace("Psalm 95", "\\xt Psalm 95\\xt*")
-    text = text.replace("Acts 25-26", "\\xt Acts 25-26\\xt*")
-    text = text.replace("Judges 5", "\\xt Judges 5\\xt*")
-    text = text.replace("Zechariah 8", "\\xt Zechariah 8\\xt*")
-    
-    # Handle "Genesis chapter 2" format
-    for book in bible_books:
-        pattern = f"{book} chapter (\\d+)"
-        text = re.sub(pattern, f"\\\\xt {book} \\1\\\\xt*", text)
-    
-    # Handle "Hebrews chapters 3 and 4" format
-    for book in bible_books:
-        pattern = f"{book} chapters (\\d+) and (\\d+)"
-        text = re.sub(pattern, f"\\\\xt {book} \\1-\\2\\\\xt*", text)
-    
-    # Handle "book of Judges" format
-    for book in bible_books:
-        pattern = f"book of {book}"
-        text = re.sub(pattern, f"book of \\\\xt {book}\\\\xt*", text)
-    
-    return text
+        documents: List or iterable of (file_path, Document) tuples
+        resource_map: A dictionary mapping resourceId to term names
+        output_file: The USFM dictionary to write
+        backlinks: Optional map from usfm_common.load_backlinks for "Used in" lists
+    """
+    if not isinstance(documents, list):
+        # Process each document; entries are ordered by filename as in the per-file export
+        entries = []
+        for i, (json_file, data) in enumerate(documents):
+            try:
+                if i % 10 == 0:
+                    print(f"Processing file {i+1}")
+                entries.append((os.path.basename(json_file), process_document(data, resource_map, backlinks)))
+            except Exception as e:
+                print(f"Error processing {json_file}: {e}")
+        
+        # Write the USFM content to the output file
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(render_dictionary(entries))
+        
+        print(f"Conversion complete. Output written to {output_file}")
+        return
+    
+    renderer = get_renderer(resource_map)
+    documents = sorted(documents, key=lambda item: os.path.basename(item[0]))
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(DICTIONARY_HEADER)
+        for i, (json_file, data) in enumerate(documents):
+            if i % 10 == 0:
+                print(f"Processing file {i+1}")
+            start = f.tell()
+            try:
+                write_entry(f, data, renderer, backlinks)
+                f.write("\n")
+            except Exception as e:
+                # Drop whatever part of the entry was written before the failure
+                f.seek(start)
+                f.truncate()
+                print(f"Error processing {json_file}: {e}")
+    
+    print(f"Conversion complete. Output written to {output_file}")
 
-def build_resource_map(json_dir):
+def convert_key_terms_cached(raw_documents, resource_map, output_file, cache, backlinks=None):
     """
-    Build a mapping of resourceId to term names.
+    Render key term documents into the USFM dictionary, reusing cached entries.
+    
+    Only documents missing from the render cache are decoded and rendered, so
+    rerunning on an unchanged corpus just reads, hashes and looks up each file.
+    
+    Args:
+        raw_documents: Iterable of (filename, JSON bytes) tuples
+        resource_map: A dictionary mapping resourceId to term names
+        output_file: The USFM dictionary to write
+        cache: The RenderCache to read and fill
+        backlinks: Optional map from usfm_common.load_backlinks for "Used in" lists
     """
-    resource_map = {}
-    json_files = glob.glob(os.path.join(json_dir, "*.json"))
+    map_hash = resource_map_hash(resource_map)
+    if backlinks:
+        # Entries with "Used in" lists also depend on which notes link each term
+        map_hash += ":" + resource_map_hash(backlinks)
+    entries = []
+    for i, (filename, raw) in enumerate(raw_documents):
+        if i % 10 == 0:
+            print(f"Processing file {i+1}")
+        key = cache.key('keyterm', filename, raw, map_hash)
+        entry = cache.get(key)
+        if entry is None:
+            try:
+                entry = process_document(decode_document(raw), resource_map, backlinks)
+            except Exception as e:
+                print(f"Error processing {filename}: {e}")
+                continue
+            cache.put(key, entry)
+        entries.append((filename, entry))
+    
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(render_dictionary(entries))
     
-    print(f"Found {len(json_files)} JSON files for resource map")
+    print(f"Conversion complete. Output written to {output_file}")
+
+def convert_key_terms_from_runs(table, resource_map, output_file):
+    """
+    Render the key terms flattened into a run_table.RunTable into the USFM dictionary.
     
-    for json_file in json_files:
+    Args:
+        table: RunTable holding one document per key term
+        resource_map: A dictionary mapping resourceId to term names
+        output_file: The USFM dictionary to write
+    """
+    renderer = get_renderer(resource_map)
+    entries = []
+    for doc_id, json_file in enumerate(table.filenames):
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                resource_id = str(data.get('referenceId', ''))
-                term_name = data.get('name', '')
-                if resource_id and term_name:
-                    resource_map[resource_id] = term_name
+            out = io.StringIO()
+            out.write(entry_heading(table.names[doc_id]))
+            renderer.render_runs(table.iter_runs(doc_id), out)
+            entries.append((os.path.basename(json_file), out.getvalue()))
         except Exception as e:
-            print(f"Error processing {json_file} for resource map: {e}")
+            print(f"Error processing {json_file}: {e}")
+    
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(render_dictionary(entries))
     
-    return resource_map
+    print(f"Conversion complete. Output written to {output_file}")
 
-def process_json_file(file_path, resource_map):
+def build_incremental(raw_documents, resource_map, output_file, manifest_file):
     """
-    Process a single JSON file and return a dictionary entry in USFM format.
-    """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    Re-render only the dictionary entries affected by changes since the last build.
     
-    # Extract the key term name
-    term_name = data.get('name', '')
+    An entry is re-rendered when its JSON bytes changed or when it references a
+    key term that was added, removed or renamed. The dictionary is rewritten
+    only if an entry changed or the file no longer matches what was last written.
     
-    # Extract content from TipTap format
-    content_text = ""
-    for content_item in data.get('content', []):
-        if 'tiptap' in content_item:
-            tiptap_data = content_item['tiptap']
-            content_text += extract_text_from_tiptap(tiptap_data, resource_map)
+    Args:
+        raw_documents: Iterable of (filename, JSON bytes) tuples
+        resource_map: A dictionary mapping resourceId to term names
+        output_file: The USFM dictionary to write
+        manifest_file: Path of the build manifest
+    """
+    manifest = BuildManifest(manifest_file)
+    changed_resources = manifest.changed_resources(resource_map)
+    dirty = False
+    seen = set()
+    rendered = 0
+    
+    for filename, raw in raw_documents:
+        seen.add(filename)
+        digest = content_hash(raw)
+        if manifest.is_fresh(filename, digest, changed_resources):
+            continue
+        
+        dirty = manifest.forget(filename) is not None or dirty
+        try:
+            data = decode_document(raw)
+            entry = process_document(data, resource_map)
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+            continue
+        
+        resources = referenced_resources([item.tiptap for item in data.content])
+        manifest.record(filename, digest, output_file, resources, entry)
+        dirty = True
+        rendered += 1
     
-    # Format Scripture references
-    content_text = format_scripture_references(content_text)
+    for filename in [name for name in manifest.inputs if name not in seen]:
+        manifest.forget(filename)
+        dirty = True
     
-    # Format as USFM dictionary entry
-    usfm_entry = f"\\p \\k {term_name}\\k*\\im {content_text}"
+    if dirty or not manifest.output_is_current(output_file):
+        usfm_content = render_dictionary((name, entry['result']) for name, entry in manifest.inputs.items())
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(usfm_content)
+        manifest.record_output(output_file, usfm_content)
+        print(f"Re-rendered {rendered} entries and rewrote {output_file}")
+    else:
+        print(f"{output_file} is up to date")
     
-    return usfm_entry
+    manifest.save(resource_map)
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert Biblica key term JSON to a USFM dictionary.")
+    parser.add_argument("--pack", help="Read documents from a corpus pack instead of the JSON directory")
+    parser.add_argument("--dump", help="Stream documents from a JSON array or JSON-lines API dump")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-render entries changed since the last incremental build")
+    parser.add_argument("--manifest", default="./.build_manifest_keyterms.json",
+                        help="Build manifest used by --incremental")
+    parser.add_argument("--no-cache", action="store_true", help="Render every entry instead of using the render cache")
+    parser.add_argument("--cache-file", default=DEFAULT_CACHE_FILE, help="SQLite render cache")
+    parser.add_argument("--used-in", action="store_true",
+                        help="End each entry with the study note passages that link the term "
+                             "(from the concordance the study note conversion writes)")
+    args = parser.parse_args()
+    if args.incremental and args.dump:
+        parser.error("--incremental cannot be combined with --dump")
+    if args.incremental and args.used_in:
+        parser.error("--incremental cannot be combined with --used-in")
+    
     # Define input and output paths
     input_dir = "./json BiblicaStudyNotesKeyTerms/json/"
+    notes_output_dir = "./usfm_study_notes/"
     output_file = "./BiblicaKeyTerms.sfm"
     
-    # Build resource map
-    print("Building resource map...")
-    resource_map = build_resource_map(input_dir)
-    print(f"Found {len(resource_map)} resources")
+    backlinks = None
+    if args.used_in:
+        # The study note conversion already recorded which notes link each term
+        backlinks = load_backlinks(notes_output_dir)
+        if backlinks is None:
+            sys.exit(f"Study note concordance or verse index missing in {notes_output_dir}; "
+                     "run convert_study_notes_to_usfm.py first")
+        print(f"Found study note links to {len(backlinks)} key terms")
     
-    # Get all JSON files in the input directory
-    json_files = glob.glob(os.path.join(input_dir, "*.json"))
-    print(f"Found {len(json_files)} JSON files to process")
+    if args.incremental:
+        if args.pack:
+            with PackReader(args.pack) as pack:
+                corpus = KeyTermCorpus.from_pack(pack)
+                build_incremental(corpus.raw_documents, corpus.resource_map, output_file, args.manifest)
+        else:
+            resource_map, raw_documents = load_key_term_inputs(input_dir)
+            build_incremental(raw_documents, resource_map, output_file, args.manifest)
+        print(f"Conversion complete. Output written to {output_file}")
+        return
     
-    # Create USFM header with license information
-    usfm_content = """\\id BD
-\\c 1
-\\ms Biblica Key Terms Dictionary
-
-\\periph Copyright Information
-\\mt Biblica Bible Dictionary
-\\pc Copyright © 2023 Biblica, Inc.
-\\pc https://www.biblica.com/
-\\pc Licensed under CC BY-SA 4.0 license
-\\pc https://creativecommons.org/licenses/by-sa/4.0/legalcode.en
-
-"""
+    if not args.dump and not args.no_cache:
+        # Unchanged entries come straight from the render cache; only misses are decoded
+        with RenderCache(args.cache_file) as cache:
+            if args.pack:
+                with PackReader(args.pack) as pack:
+                    corpus = KeyTermCorpus.from_pack(pack)
+                    print(f"Found {len(corpus.resource_map)} resources")
+                    convert_key_terms_cached(corpus.raw_documents, corpus.resource_map, output_file, cache, backlinks)
+            else:
+                # A stale index means decoding the corpus anyway; its bytes then feed the cache too
+                resource_map, raw_documents = load_key_term_inputs(input_dir)
+                print(f"Found {len(resource_map)} resources")
+                convert_key_terms_cached(raw_documents, resource_map, output_file, cache, backlinks)
+        return
     
-    # Process each JSON file
-    for i, json_file in enumerate(sorted(json_files)):
-        try:
-            if i % 10 == 0:
-                print(f"Processing file {i+1}/{len(json_files)}")
-            entry = process_json_file(json_file, resource_map)
-            usfm_content += entry + "\n"
-        except Exception as e:
-            print(f"Error processing {json_file}: {e}")
+    if args.dump:
+        # Two streaming passes: every term must be in the resource map before any entry is rendered
+        print(f"Building resource map from {args.dump}...")
+        resource_map = resource_map_from_dump(args.dump)
+        documents = iter_dump_documents(args.dump, KEY_TERMS_GROUPING)
+    else:
+        # Load every key term once; the same documents feed the resource map and rendering
+        print("Loading key term corpus...")
+        if args.pack:
+            with PackReader(args.pack) as pack:
+                corpus = KeyTermCorpus.from_pack(pack)
+        else:
+            corpus = KeyTermCorpus(input_dir)
+        resource_map = corpus.resource_map
+        documents = corpus.documents
+    print(f"Found {len(resource_map)} resources")
     
-    # Write the USFM content to the output file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(usfm_content)
+    # Refresh the sidecar index so later runs can skip rebuilding the resource map
+    if not args.pack and not args.dump:
+        index_file = write_resource_index(resource_map, input_dir)
+        if index_file:
+            print(f"Resource index written to {index_file}")
     
-    print(f"Conversion complete. Output written to {output_file}")
+    convert_key_terms(documents, resource_map, output_file, backlinks)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Packed, memory-mapped snapshot of the study note and key term corpora.
+
+A pack file is laid out as:
+
+    header   magic, version, entry count, string table offset/size
+    entries  one fixed-size record per document: collection, id, referenceId,
+             payload offset/length, filename offset/length
+    strings  UTF-8 filenames referenced by the entries
+    payloads the original JSON documents, byte for byte
+
+Readers map the file once and build in-memory lookups by id, referenceId and
+filename from the entry table, so fetching any document is a dictionary lookup
+and a slice of the mapping with no further filesystem access.
+"""
+import argparse
+import glob
+import mmap
+import os
+import struct
+from json_backend import decode_document
+
+MAGIC = b'BNXPACK1'
+VERSION = 1
+
+NOTES = 0
+KEY_TERMS = 1
+
+DEFAULT_NOTES_DIR = "./json BiblicaStudyNotes/json/"
+DEFAULT_KEY_TERMS_DIR = "./json BiblicaStudyNotesKeyTerms/json/"
+DEFAULT_PACK_FILE = "./corpus.pack"
+
+_HEADER = struct.Struct('<8sIIQQ')
+_ENTRY = struct.Struct('<BxxxqqQIII')
+
+# referenceId/id values are stored as int64; -1 marks a missing value
+_MISSING = -1
+
+def _read_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return _MISSING
+
+def pack_corpus(notes_dir, key_terms_dir, output_file):
+    """
+    Compile the study note and key term JSON directories into one pack file.
+
+    Args:
+        notes_dir: Directory containing the study note JSON files
+        key_terms_dir: Directory containing the key term JSON files
+        output_file: Path of the pack file to write
+
+    Returns:
+        The number of documents written
+    """
+    sources = []
+    for collection, json_dir in ((NOTES, notes_dir), (KEY_TERMS, key_terms_dir)):
+        for json_file in sorted(glob.glob(os.path.join(json_dir, "*.json"))):
+            sources.append((collection, json_file))
+
+    entries = []
+    strings = bytearray()
+    payloads = []
+    payload_size = 0
+    for collection, json_file in sources:
+        with open(json_file, 'rb') as f:
+            raw = f.read()
+        try:
+            data = decode_document(raw)
+        except Exception as e:
+            print(f"Error processing {json_file}: {e}")
+            continue
+
+        filename = os.path.basename(json_file).encode('utf-8')
+        entries.append((collection, _read_id(data.id), _read_id(data.reference_id),
+                        payload_size, len(raw), len(strings), len(filename)))
+        strings += filename
+        payloads.append(raw)
+        payload_size += len(raw)
+
+    strings_offset = _HEADER.size + _ENTRY.size * len(entries)
+    payloads_offset = strings_offset + len(strings)
+
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(entries), strings_offset, len(strings)))
+        for collection, doc_id, reference_id, offset, length, name_offset, name_length in entries:
+            f.write(_ENTRY.pack(collection, doc_id, reference_id, payloads_offset + offset,
+                                length, name_offset, name_length))
+        f.write(strings)
+        for raw in payloads:
+            f.write(raw)
+    os.replace(tmp_file, output_file)
+
+    return len(entries)
+
+class PackReader:
+    """
+    Read-only, memory-mapped view of a pack file written by pack_corpus.
+    """
+
+    def __init__(self, pack_file):
+        self.pack_file = pack_file
+        with open(pack_file, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, strings_offset, strings_size = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{pack_file} is not a version {VERSION} corpus pack")
+
+        strings = self._map[strings_offset:strings_offset + strings_size]
+        table = self._map[_HEADER.size:_HEADER.size + _ENTRY.size * count]
+
+        # Each entry is (collection, filename, offset, length)
+        self.entries = []
+        self._by_filename = {}
+        self._by_id = {}
+        self._by_reference_id = {}
+        for collection, doc_id, reference_id, offset, length, name_offset, name_length in _ENTRY.iter_unpack(table):
+            filename = strings[name_offset:name_offset + name_length].decode('utf-8')
+            entry = (collection, filename, offset, length)
+            self.entries.append(entry)
+            self._by_filename[filename] = entry
+            if doc_id != _MISSING:
+                self._by_id[doc_id] = entry
+            if reference_id != _MISSING:
+                self._by_reference_id[(collection, reference_id)] = entry
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _decode(self, entry):
+        _, _, offset, length = entry
+        return decode_document(self._map[offset:offset + length])
+
+    def raw(self, filename):
+        """
+        Return the original JSON bytes stored for a filename.
+        """
+        _, _, offset, length = self._by_filename[filename]
+        return self._map[offset:offset + length]
+
+    def filenames(self, collection):
+        """
+        Return the filenames of every document in a collection, sorted.
+        """
+        return sorted(filename for entry_collection, filename, _, _ in self.entries
+                      if entry_collection == collection)
+
+    def iter_raw(self, collection):
+        """
+        Yield (filename, JSON bytes) for every document in a collection, sorted by filename.
+        """
+        for filename in self.filenames(collection):
+            yield filename, self.raw(filename)
+
+    def documents(self, collection):
+        """
+        Decode every document in a collection.
+
+        Returns:
+            List of (filename, Document) tuples sorted by filename
+        """
+        return [(filename, self._decode(self._by_filename[filename]))
+                for filename in self.filenames(collection)]
+
+    def get_by_filename(self, filename):
+        return self._decode(self._by_filename[filename])
+
+    def get_by_id(self, doc_id):
+        return self._decode(self._by_id[int(doc_id)])
+
+    def get_by_reference_id(self, collection, reference_id):
+        return self._decode(self._by_reference_id[(collection, int(reference_id))])
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the study note and key term JSON exports into one file.")
+    parser.add_argument("--notes-dir", default=DEFAULT_NOTES_DIR, help="Study note JSON directory")
+    parser.add_argument("--key-terms-dir", default=DEFAULT_KEY_TERMS_DIR, help="Key term JSON directory")
+    parser.add_argument("-o", "--output", default=DEFAULT_PACK_FILE, help="Pack file to write")
+    args = parser.parse_args()
+
+    count = pack_corpus(args.notes_dir, args.key_terms_dir, args.output)
+    print(f"Packed {count} documents into {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Stream documents out of a single large API dump.
+
+The upstream export can arrive as one JSON array of documents or as JSON
+lines instead of one file per resource. iter_dump scans the dump in fixed
+size chunks and yields each top-level object as soon as its closing brace is
+seen, so only the document currently being read is ever held in memory.
+"""
+import re
+from json_backend import decode_document
+
+CHUNK_SIZE = 1 << 20
+
+# grouping.type of each collection in the export
+STUDY_NOTES_GROUPING = 'StudyNotes'
+KEY_TERMS_GROUPING = 'Dictionary'
+
+# Outside a string only braces and quotes matter; inside one, quotes and escapes
+_OUTSIDE_STRING = re.compile(rb'[{}"]')
+_INSIDE_STRING = re.compile(rb'["\\]')
+
+_OPEN_BRACE = ord('{')
+_QUOTE = ord('"')
+_BACKSLASH = ord('\\')
+
+def iter_dump(dump_file, chunk_size=CHUNK_SIZE):
+    """
+    Yield the raw bytes of every top-level object in a JSON array or JSON-lines dump.
+
+    Args:
+        dump_file: Path to the dump
+        chunk_size: Number of bytes read per I/O call
+    """
+    with open(dump_file, 'rb') as f:
+        buf = b''
+        pos = 0
+        start = -1
+        depth = 0
+        in_string = False
+        while True:
+            pattern = _INSIDE_STRING if in_string else _OUTSIDE_STRING
+            match = pattern.search(buf, pos)
+            if match is None:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    if start >= 0:
+                        raise ValueError(f"Truncated document at end of {dump_file}")
+                    return
+                if start >= 0:
+                    # Keep only the document being read
+                    buf = buf[start:] + chunk
+                    pos -= start
+                    start = 0
+                else:
+                    buf = chunk
+                    pos = 0
+                continue
+
+            char = buf[match.start()]
+            pos = match.end()
+            if in_string:
+                if char == _BACKSLASH:
+                    pos += 1
+                else:
+                    in_string = False
+            elif char == _QUOTE:
+                if start < 0:
+                    raise ValueError(f"Unexpected value outside a document in {dump_file}")
+                in_string = True
+            elif char == _OPEN_BRACE:
+                if depth == 0:
+                    start = match.start()
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    yield buf[start:pos]
+                    start = -1
+                elif depth < 0:
+                    raise ValueError(f"Unbalanced '}}' in {dump_file}")
+
+def iter_dump_documents(dump_file, grouping_type=None):
+    """
+    Decode the documents of a dump one at a time.
+
+    Args:
+        dump_file: Path to the dump
+        grouping_type: Only yield documents whose grouping.type matches (all if None)
+
+    Yields:
+        (filename, Document) tuples, where filename is the per-file export name
+    """
+    for raw in iter_dump(dump_file):
+        try:
+            data = decode_document(raw)
+        except Exception as e:
+            print(f"Error decoding document in {dump_file}: {e}")
+            continue
+        if grouping_type and data.grouping is not None and data.grouping.type != grouping_type:
+            continue
+        yield document_filename(data), data
+
+def document_filename(data):
+    """
+    Return the filename the per-file export uses for a document.
+
+    Args:
+        data: The decoded Document (e.g. name 'Matthew 7:1–12', id 132540)
+
+    Returns:
+        The filename (e.g. 'Matthew_7_1_12_132540.json')
+    """
+    name = re.sub(r"[’'ʼ,]", "", data.name)
+    name = re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_')
+    return f"{name}_{data.id}.json"
+
+def resource_map_from_dump(dump_file):
+    """
+    Build a mapping of resourceId to term names from the key terms in a dump.
+    """
+    resource_map = {}
+    for _, data in iter_dump_documents(dump_file, KEY_TERMS_GROUPING):
+        resource_id = str(data.reference_id) if data.reference_id is not None else ''
+        if resource_id and data.name:
+            resource_map[resource_id] = data.name
+    return resource_map
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Warm conversion daemon controlled over a local Unix socket.
+
+The daemon keeps a watch_mode.ExportState resident (decoded corpus, resource
+map, compiled regexes, rendered notes and entries) and answers one JSON
+request per line:
+
+    {"command": "rebuild", "target": "book", "name": "GEN"}
+    {"command": "rebuild", "target": "term", "name": "Damascus"}
+    {"command": "rebuild", "target": "all"}
+    {"command": "ping"} / {"command": "shutdown"}
+
+Each response is one JSON line with "ok" and either the files written or an
+"error". Inputs are re-scanned before every request and every poll interval
+while idle, so edits on disk are picked up without restarting the daemon.
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import watch_mode
+from convert_study_notes_to_usfm import get_book_id
+
+DEFAULT_SOCKET = "./.biblionexus-export.sock"
+
+class ExportRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            start = time.perf_counter()
+            try:
+                response = self.server.dispatch(json.loads(line))
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            response['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+            self.wfile.flush()
+
+class ExportDaemon(socketserver.UnixStreamServer):
+    """
+    Unix socket server that serves rebuild requests from a resident ExportState.
+    """
+
+    def __init__(self, socket_path, state, poll_interval=1.0):
+        self.state = state
+        self.poll_interval = poll_interval
+        self._last_refresh = 0.0
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, ExportRequestHandler)
+
+    def refresh(self):
+        written = self.state.refresh()
+        self._last_refresh = time.monotonic()
+        if written:
+            print(f"Regenerated {len(written)} file(s) after input changes")
+        return written
+
+    def service_actions(self):
+        # Called by serve_forever between requests; keeps outputs current while idle
+        if time.monotonic() - self._last_refresh >= self.poll_interval:
+            self.refresh()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+    def _find_book(self, name):
+        for _, (book_name, _, _, _) in self.state.rendered_notes.items():
+            if name in (book_name, get_book_id(book_name)):
+                return book_name
+        raise ValueError(f"Unknown book '{name}'")
+
+    def _find_term(self, name):
+        name = str(name)
+        for filename, (_, data) in self.state.key_terms.items():
+            if data is None:
+                continue
+            if name in (filename, str(data.reference_id)) or name.lower() == data.name.lower():
+                return filename
+        raise ValueError(f"Unknown key term '{name}'")
+
+    def dispatch(self, request):
+        """
+        Handle one decoded request and return the response dictionary.
+        """
+        command = request.get('command')
+        if command == 'ping':
+            return {'ok': True}
+        if command == 'shutdown':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True}
+        if command != 'rebuild':
+            raise ValueError(f"Unknown command '{command}'")
+
+        changed = self.refresh()
+        target = request.get('target', 'all')
+        if target == 'book':
+            files = [self.state.write_book(self._find_book(request.get('name')))]
+            return {'ok': True, 'files': files, 'changed': changed}
+        if target == 'term':
+            filename = self._find_term(request.get('name'))
+            self.state.render_entry(filename)
+            files = [self.state.write_dictionary()]
+            return {'ok': True, 'files': files, 'changed': changed,
+                    'entry': self.state.rendered_entries.get(filename)}
+        if target == 'all':
+            book_names = sorted({book_name for book_name, _, _, _ in self.state.rendered_notes.values()})
+            files = [self.state.write_book(book_name) for book_name in book_names]
+            files.extend(self.state.write_note_index())
+            files.append(self.state.write_dictionary())
+            return {'ok': True, 'files': files, 'changed': changed}
+        raise ValueError(f"Unknown target '{target}'")
+
+def serve(socket_path=DEFAULT_SOCKET, poll_interval=1.0):
+    """
+    Load the corpus and serve requests until a shutdown request or Ctrl+C.
+    """
+    os.makedirs(watch_mode.DEFAULT_OUTPUT_DIR, exist_ok=True)
+    state = watch_mode.ExportState()
+    print("Loading corpus...")
+    with ExportDaemon(socket_path, state, poll_interval) as daemon:
+        daemon.refresh()
+        print(f"Listening on {socket_path}")
+        try:
+            daemon.serve_forever(poll_interval=min(poll_interval, 0.5))
+        except KeyboardInterrupt:
+            pass
+    print("Daemon stopped")
+
+def send_request(request, socket_path=DEFAULT_SOCKET):
+    """
+    Send one request to a running daemon and return the decoded response.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+        with sock.makefile('rb') as f:
+            return json.loads(f.readline())
+
+def request_from_args(command, target=None, name=None):
+    """
+    Build a request from client arguments such as ('rebuild', 'book', 'GEN').
+    """
+    request = {'command': command}
+    if target is not None:
+        request['target'] = target
+    if name is not None:
+        request['name'] = name
+    return request
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm USFM conversion daemon.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the daemon")
+    serve_parser.add_argument("--interval", type=float, default=1.0, help="Seconds between input scans while idle")
+
+    client_parser = subparsers.add_parser("client", help="Send a request to a running daemon")
+    client_parser.add_argument("command", choices=["rebuild", "ping", "shutdown"])
+    client_parser.add_argument("target", nargs="?", choices=["book", "term", "all"])
+    client_parser.add_argument("name", nargs="?", help="Book ID/name or key term name/referenceId")
+
+    args = parser.parse_args()
+    if args.mode == "serve":
+        serve(args.socket, args.interval)
+        return
+
+    response = send_request(request_from_args(args.command, args.target, args.name), args.socket)
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    if not response.get('ok'):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Pluggable JSON decoding for BiblioNexus export documents.
+
+Documents are decoded from raw bytes straight into the typed structs below,
+keeping only the fields the converters read. msgspec is used when it is
+installed, then orjson, and the standard library json module otherwise.
+Set BIBLIONEXUS_JSON_BACKEND to force a particular backend.
+"""
+import json
+import os
+from typing import Any
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if msgspec is not None:
+    class Grouping(msgspec.Struct):
+        type: str = ''
+        name: str = ''
+
+    class Language(msgspec.Struct):
+        id: int = 0
+        code: str = ''
+
+    class ContentItem(msgspec.Struct):
+        tiptap: Any = None
+
+    class Document(msgspec.Struct, rename="camel"):
+        id: Any = None
+        reference_id: Any = None
+        name: str = ''
+        localized_name: str = ''
+        content: list[ContentItem] = []
+        grouping: Grouping | None = None
+        language: Language | None = None
+else:
+    class Grouping:
+        __slots__ = ('type', 'name')
+
+        def __init__(self, type='', name=''):
+            self.type = type
+            self.name = name
+
+    class Language:
+        __slots__ = ('id', 'code')
+
+        def __init__(self, id=0, code=''):
+            self.id = id
+            self.code = code
+
+    class ContentItem:
+        __slots__ = ('tiptap',)
+
+        def __init__(self, tiptap=None):
+            self.tiptap = tiptap
+
+    class Document:
+        __slots__ = ('id', 'reference_id', 'name', 'localized_name', 'content', 'grouping', 'language')
+
+        def __init__(self, id=None, reference_id=None, name='', localized_name='',
+                     content=None, grouping=None, language=None):
+            self.id = id
+            self.reference_id = reference_id
+            self.name = name
+            self.localized_name = localized_name
+            self.content = content if content is not None else []
+            self.grouping = grouping
+            self.language = language
+
+def _document_from_builtins(data):
+    """
+    Build a Document from a generic decoded dictionary.
+    """
+    if msgspec is not None:
+        return msgspec.convert(data, Document)
+
+    grouping = data.get('grouping')
+    language = data.get('language')
+    return Document(
+        id=data.get('id'),
+        reference_id=data.get('referenceId'),
+        name=data.get('name', ''),
+        localized_name=data.get('localizedName', ''),
+        content=[ContentItem(item.get('tiptap')) for item in data.get('content', [])],
+        grouping=Grouping(grouping.get('type', ''), grouping.get('name', '')) if grouping else None,
+        language=Language(language.get('id', 0), language.get('code', '')) if language else None,
+    )
+
+def _decode_msgspec(raw):
+    return _msgspec_decoder.decode(raw)
+
+def _decode_orjson(raw):
+    return _document_from_builtins(orjson.loads(raw))
+
+def _decode_json(raw):
+    return _document_from_builtins(json.loads(raw))
+
+_msgspec_decoder = msgspec.json.Decoder(Document) if msgspec is not None else None
+
+BACKENDS = {
+    'msgspec': _decode_msgspec if msgspec is not None else None,
+    'orjson': _decode_orjson if orjson is not None else None,
+    'json': _decode_json,
+}
+
+def available_backends():
+    """
+    Return the names of the decoding backends usable in this interpreter, fastest first.
+    """
+    return [name for name, decoder in BACKENDS.items() if decoder is not None]
+
+def set_backend(name):
+    """
+    Select the decoding backend used by decode_document.
+
+    Args:
+        name: One of 'msgspec', 'orjson' or 'json'
+    """
+    global backend_name, _decode
+    decoder = BACKENDS.get(name)
+    if decoder is None:
+        raise ValueError(f"JSON backend '{name}' is not available (have: {', '.join(available_backends())})")
+    backend_name = name
+    _decode = decoder
+
+def decode_document(raw):
+    """
+    Decode one export document from bytes.
+
+    Args:
+        raw: The UTF-8 encoded JSON document
+
+    Returns:
+        A Document struct
+    """
+    return _decode(raw)
+
+def load_document(file_path):
+    """
+    Read and decode one export document from disk.
+    """
+    with open(file_path, 'rb') as f:
+        return _decode(f.read())
+
+backend_name = None
+_decode = None
+set_backend(os.environ.get('BIBLIONEXUS_JSON_BACKEND') or available_backends()[0])
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import os
+import glob
+from json_backend import decode_document
+from corpus_pack import KEY_TERMS
+
+class KeyTermCorpus:
+    """
+    Key term documents decoded once and shared by resource map building and rendering.
+
+    The JSON bytes each document was decoded from are kept as well, so the
+    render cache can hash them without reading the files a second time.
+
+    Attributes:
+        json_dir: Directory the key term JSON files were loaded from
+        documents: List of (file_path, Document) tuples sorted by file path
+        raw_documents: List of (filename, JSON bytes) tuples in the same order
+        resource_map: A dictionary mapping resourceId to term names
+    """
+
+    def __init__(self, json_dir=None):
+        self.json_dir = json_dir
+        self.documents = []
+        self.raw_documents = []
+        self.resource_map = {}
+        if json_dir is not None:
+            self._load()
+
+    @classmethod
+    def from_pack(cls, pack_reader):
+        """
+        Build the corpus from the key term collection of a corpus pack.
+
+        Args:
+            pack_reader: An open corpus_pack.PackReader
+        """
+        corpus = cls()
+        raw_documents = list(pack_reader.iter_raw(KEY_TERMS))
+        print(f"Found {len(raw_documents)} key term documents in {pack_reader.pack_file}")
+        for filename, raw in raw_documents:
+            try:
+                data = decode_document(raw)
+            except Exception as e:
+                print(f"Error processing {filename}: {e}")
+                continue
+            corpus.add_document(filename, data, raw)
+        return corpus
+
+    def _load(self):
+        json_files = glob.glob(os.path.join(self.json_dir, "*.json"))
+        print(f"Found {len(json_files)} key term JSON files")
+
+        for json_file in sorted(json_files):
+            try:
+                with open(json_file, 'rb') as f:
+                    raw = f.read()
+                data = decode_document(raw)
+            except Exception as e:
+                print(f"Error processing {json_file}: {e}")
+                continue
+            self.add_document(json_file, data, raw)
+
+    def add_document(self, file_path, data, raw=None):
+        """
+        Register a decoded key term document and its resource map entry.
+
+        Args:
+            file_path: Path or filename the document was read from
+            data: The decoded Document
+            raw: The JSON bytes it was decoded from, if available
+        """
+        self.documents.append((file_path, data))
+        if raw is not None:
+            self.raw_documents.append((os.path.basename(file_path), raw))
+        resource_id = str(data.reference_id) if data.reference_id is not None else ''
+        term_name = data.name
+        if resource_id and term_name:
+            self.resource_map[resource_id] = term_name
+
+    def tiptap_content(self, data):
+        """
+        Return the TipTap trees of a key term document in order.
+        """
+        return [item.tiptap for item in data.content]
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __iter__(self):
+        return iter(self.documents)
+
+def build_resource_map(json_dir):
+    """
+    Build a mapping of resourceId to term names.
+    """
+    return KeyTermCorpus(json_dir).resource_map
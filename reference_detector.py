@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Aho-Corasick detector for candidate Scripture references.
+
+Every reference rule (see reference_rules) starts with a literal
+anchor: a special-case reference, "<book> chapter ", "<book> chapters " or
+"book of <book>". All anchors go into one Aho-Corasick automaton, so a
+single pass over a note finds every place a rule could apply, however many
+books, aliases or languages the rules were built for. Only those places are
+then checked against the rule's full pattern (the chapter digits).
+"""
+import re
+from aho_corasick import AhoCorasick
+from span_annotations import Span
+
+# Bible book names, in the order the reference rules are applied
+BIBLE_BOOKS = (
+    "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy",
+    "Joshua", "Judges", "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings",
+    "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah", "Esther", "Job",
+    "Psalm", "Psalms", "Proverbs", "Ecclesiastes", "Song of Solomon", "Song of Songs",
+    "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel", "Hosea", "Joel",
+    "Amos", "Obadiah", "Jonah", "Micah", "Nahum", "Habakkuk", "Zephaniah", "Haggai",
+    "Zechariah", "Malachi", "Matthew", "Mark", "Luke", "John", "Acts", "Romans",
+    "1 Corinthians", "2 Corinthians", "Galatians", "Ephesians", "Philippians",
+    "Colossians", "1 Thessalonians", "2 Thessalonians", "1 Timothy", "2 Timothy",
+    "Titus", "Philemon", "Hebrews", "James", "1 Peter", "2 Peter", "1 John", "2 John",
+    "3 John", "Jude", "Revelation"
+)
+
+# References that are linked exactly as written
+SPECIAL_REFERENCES = (
+    "Exodus 3:14", "Luke 8:31", "Psalm 95", "Acts 25-26", "Judges 5", "Zechariah 8", "Exodus 34:6"
+)
+
+def reference_rules(books=BIBLE_BOOKS, special_references=SPECIAL_REFERENCES):
+    """
+    Return the reference rules as (anchor, pattern, render) tuples, highest priority first.
+
+    The anchor is the literal text every match of the rule starts with, and
+    render turns the matched text into its USFM. Priority follows the order
+    the rules were originally applied in: special cases, "Genesis chapter 2",
+    "Hebrews chapters 3 and 4", then "book of Judges", each in book order.
+
+    Args:
+        books: Book names (or aliases) to build rules for, in priority order
+        special_references: References that are linked exactly as written
+    """
+    rules = []
+    for reference in special_references:
+        rules.append((reference, re.escape(reference), lambda text: f"\\xt {text}\\xt*"))
+
+    for book in books:
+        def chapter(text, book=book):
+            return f"\\xt {book} {text[len(book) + len(' chapter '):]}\\xt*"
+        rules.append((f"{book} chapter ", re.escape(book) + r" chapter \d+", chapter))
+
+    for book in books:
+        def chapters(text, book=book):
+            first, second = text[len(book) + len(' chapters '):].split(" and ")
+            return f"\\xt {book} {first}-{second}\\xt*"
+        rules.append((f"{book} chapters ", re.escape(book) + r" chapters \d+ and \d+", chapters))
+
+    for book in books:
+        def book_of(text, book=book):
+            return f"book of \\xt {book}\\xt*"
+        rules.append((f"book of {book}", "book of " + re.escape(book), book_of))
+
+    return rules
+
+def compile_reference_pattern(rules):
+    """
+    Compile the rules into one alternation, one capturing group per rule.
+
+    This is the single-regex alternative to ReferenceDetector; its cost grows
+    with the number of rules (see benchmarks/bench_reference_detector.py).
+
+    Applying the rules one after another lets an earlier rule claim text a
+    later rule would otherwise match, even when the later match starts first
+    (e.g. "Judges 5" inside "book of Judges 5", or "John chapter 3" inside
+    "1 John chapter 3"). Each alternative therefore refuses to match where an
+    earlier rule could start inside its anchor, and alternatives are listed in
+    priority order, so a single left-to-right scan gives the same result.
+    """
+    alternatives = []
+    for i, (anchor, pattern, _) in enumerate(rules):
+        guards = []
+        for other_anchor, other_pattern, _ in rules[:i]:
+            for offset in range(1, len(anchor)):
+                rest = anchor[offset:]
+                if rest.startswith(other_anchor) or other_anchor.startswith(rest):
+                    guards.append(f".{{{offset}}}(?:{other_pattern})")
+        guard = f"(?!{'|'.join(guards)})" if guards else ""
+        # The cheap literal lookahead keeps the guards from running at most positions
+        alternatives.append(f"(?={re.escape(anchor[:2])}){guard}({pattern})")
+
+    first_chars = "".join(sorted({re.escape(anchor[0]) for anchor, _, _ in rules}))
+    return re.compile(f"(?=[{first_chars}])(?:{'|'.join(alternatives)})")
+
+class ReferenceDetector:
+    """
+    Find every match of every reference rule in a text.
+
+    Attributes:
+        rules: The (anchor, pattern, render) rules, highest priority first
+    """
+
+    def __init__(self, rules=None):
+        self.rules = reference_rules() if rules is None else rules
+        self._automaton = AhoCorasick()
+        self._patterns = []
+        for index, (anchor, pattern, _) in enumerate(self.rules):
+            self._automaton.add(anchor, index)
+            self._patterns.append(re.compile(pattern))
+        self._automaton.build()
+
+    def find_matches(self, text):
+        """
+        Return every rule match in the text, overlapping matches included.
+
+        Returns:
+            List of (start, end, rule_index) tuples, sorted by start and then by priority
+        """
+        patterns = self._patterns
+        matches = []
+        for start, _, index in self._automaton.iter_matches(text):
+            match = patterns[index].match(text, start)
+            if match is not None:
+                matches.append((start, match.end(), index))
+        matches.sort()
+        return matches
+
+    def render(self, text, start, end, rule_index):
+        """
+        Return the USFM replacement for one match.
+        """
+        return self.rules[rule_index][2](text[start:end])
+
+    def spans(self, text):
+        """
+        Return a replacement Span for every rule match, prioritized by rule order.
+        """
+        rules = self.rules
+        return [Span(start, end, rules[index][2](text[start:end]), index)
+                for start, end, index in self.find_matches(text)]
+
+_default_detector = None
+
+def get_detector():
+    """
+    Return a shared detector for the default rules, building it on first use.
+    """
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = ReferenceDetector()
+    return _default_detector
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite cache of rendered USFM fragments.
+
+Each entry is keyed by the kind of fragment, the input filename, the hash of
+the input document's JSON bytes, the hash of the resource map and the
+renderer version, so a hit is only possible when rendering again would give
+exactly the same result. Values are the JSON-encoded render results.
+
+The cache is bounded: when it grows past max_bytes, the least recently used
+entries are evicted until it fits again.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from tiptap_render import RENDERER_VERSION
+
+DEFAULT_CACHE_FILE = "./.render_cache.sqlite"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+def resource_map_hash(resource_map):
+    """
+    Return a hex digest identifying the contents of a resource map.
+    """
+    items = sorted((str(resource_id), name) for resource_id, name in resource_map.items())
+    return hashlib.sha256(json.dumps(items, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+class RenderCache:
+    """
+    Size-bounded, least-recently-used cache of render results in an SQLite file.
+
+    Attributes:
+        path: The SQLite database file
+        max_bytes: Total size of cached values above which old entries are evicted
+        hits: Lookups answered from the cache since it was opened
+        misses: Lookups that had to be rendered
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._used = []
+        self._db = sqlite3.connect(path)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS renders (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS renders_last_used ON renders (last_used)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def key(kind, filename, raw, map_hash):
+        """
+        Build the cache key for one input document.
+
+        Args:
+            kind: What the document is rendered as (e.g. 'keyterm' or 'note')
+            filename: The input filename (study notes take their book from it)
+            raw: The document's JSON bytes
+            map_hash: resource_map_hash of the resource map it is rendered against
+        """
+        digest = hashlib.sha256(raw).hexdigest()
+        return f"{kind}:{RENDERER_VERSION}:{map_hash}:{filename}:{digest}"
+
+    def get(self, key):
+        """
+        Return the cached result for a key, or None on a miss.
+        """
+        row = self._db.execute("SELECT value FROM renders WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.append(key)
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        """
+        Store a JSON-serializable render result.
+        """
+        value = json.dumps(result, ensure_ascii=False)
+        self._db.execute("INSERT OR REPLACE INTO renders (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                         (key, value, len(value), time.time()))
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            The number of entries evicted
+        """
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM renders").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        evicted = []
+        for key, size in self._db.execute("SELECT key, size FROM renders ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM renders WHERE key = ?", evicted)
+        return len(evicted)
+
+    def close(self):
+        """
+        Record which entries were used, evict down to the size bound and commit.
+        """
+        if self._db is None:
+            return
+        now = time.time()
+        self._db.executemany("UPDATE renders SET last_used = ? WHERE key = ?", ((now, key) for key in self._used))
+        self._used = []
+        evicted = self.evict()
+        self._db.commit()
+        self._db.close()
+        self._db = None
+        print(f"Render cache: {self.hits} hits, {self.misses} misses" +
+              (f", evicted {evicted} entries" if evicted else ""))
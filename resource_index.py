@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Prebuilt sidecar index of the key term resource map.
+
+The index stores the referenceIds as a sorted int32 array, followed by a
+uint32 offset array into a UTF-8 string table of term names. A fingerprint
+of the key term directory (directory mtime plus every file's name, size and
+mtime) is stored in the header; a mismatch means the index is stale and the
+resource map is rebuilt from the JSON files.
+"""
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from keyterm_corpus import KeyTermCorpus
+from build_manifest import iter_raw_files
+
+MAGIC = b'BNXRIDX1'
+INDEX_FILENAME = "resource_map.idx"
+
+_HEADER = struct.Struct('<8s32sII')
+
+def default_index_path(json_dir):
+    """
+    Return the sidecar index path for a key term directory.
+
+    The index lives next to the directory rather than inside it so that
+    writing it does not change the directory it fingerprints.
+    """
+    return os.path.join(os.path.dirname(os.path.normpath(json_dir)), INDEX_FILENAME)
+
+def directory_fingerprint(json_dir):
+    """
+    Hash the directory mtime and the name, size and mtime of every JSON file in it.
+    """
+    digest = hashlib.sha256()
+    digest.update(str(os.stat(json_dir).st_mtime_ns).encode('ascii'))
+    entries = []
+    with os.scandir(json_dir) as it:
+        for entry in it:
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append(f"{entry.name}\0{stat.st_size}\0{stat.st_mtime_ns}")
+    for line in sorted(entries):
+        digest.update(line.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.digest()
+
+def write_resource_index(resource_map, json_dir, index_file=None):
+    """
+    Write the sidecar index for a resource map built from json_dir.
+
+    Args:
+        resource_map: A dictionary mapping resourceId to term names
+        json_dir: The key term directory the map was built from
+        index_file: Where to write the index (defaults to default_index_path)
+
+    Returns:
+        The path written, or None if the map cannot be indexed
+    """
+    index_file = index_file or default_index_path(json_dir)
+    try:
+        items = sorted((int(resource_id), name) for resource_id, name in resource_map.items())
+    except ValueError:
+        print(f"Skipping resource index: non-numeric resourceId in {json_dir}")
+        return None
+
+    ids = array('i', (resource_id for resource_id, _ in items))
+    offsets = array('I', [0])
+    names = bytearray()
+    for _, name in items:
+        names += name.encode('utf-8')
+        offsets.append(len(names))
+    if sys.byteorder != 'little':
+        ids.byteswap()
+        offsets.byteswap()
+
+    tmp_file = index_file + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, directory_fingerprint(json_dir), len(items), len(names)))
+        f.write(ids.tobytes())
+        f.write(offsets.tobytes())
+        f.write(names)
+    os.replace(tmp_file, index_file)
+    return index_file
+
+def read_resource_index(index_file, fingerprint=None):
+    """
+    Read a sidecar index back into a resource map.
+
+    Args:
+        index_file: The index to read
+        fingerprint: If given, the index is rejected unless it was written for this fingerprint
+
+    Returns:
+        A dictionary mapping resourceId to term names, or None if the index is missing or stale
+    """
+    try:
+        with open(index_file, 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return None
+
+    if len(raw) < _HEADER.size:
+        return None
+    magic, stored_fingerprint, count, names_size = _HEADER.unpack_from(raw, 0)
+    if magic != MAGIC or (fingerprint is not None and stored_fingerprint != fingerprint):
+        return None
+
+    ids_offset = _HEADER.size
+    offsets_offset = ids_offset + 4 * count
+    names_offset = offsets_offset + 4 * (count + 1)
+    if len(raw) != names_offset + names_size:
+        return None
+
+    ids = array('i')
+    ids.frombytes(raw[ids_offset:offsets_offset])
+    offsets = array('I')
+    offsets.frombytes(raw[offsets_offset:names_offset])
+    if sys.byteorder != 'little':
+        ids.byteswap()
+        offsets.byteswap()
+
+    names = raw[names_offset:]
+    return {str(ids[i]): names[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)}
+
+def load_resource_map(json_dir, index_file=None):
+    """
+    Load the resource map from the sidecar index, rebuilding it when stale.
+
+    Args:
+        json_dir: The key term directory
+        index_file: The sidecar index (defaults to default_index_path)
+
+    Returns:
+        A dictionary mapping resourceId to term names
+    """
+    resource_map, _ = load_key_term_inputs(json_dir, index_file)
+    return resource_map
+
+def load_key_term_inputs(json_dir, index_file=None):
+    """
+    Load the resource map and the raw key term documents, reading each file once.
+
+    With a fresh sidecar index the map comes from the index and the raw
+    documents are read lazily as they are consumed. Otherwise the corpus is
+    decoded once: the same read feeds the rebuilt map (and index) and the
+    raw documents, which are then served from memory.
+
+    Args:
+        json_dir: The key term directory
+        index_file: The sidecar index (defaults to default_index_path)
+
+    Returns:
+        Tuple of (resource_map, iterable of (filename, JSON bytes) sorted by filename)
+    """
+    index_file = index_file or default_index_path(json_dir)
+    resource_map = read_resource_index(index_file, directory_fingerprint(json_dir))
+    if resource_map is not None:
+        print(f"Loaded resource map from {index_file}")
+        return resource_map, iter_raw_files(json_dir)
+
+    print(f"Resource index {index_file} missing or stale, rebuilding...")
+    corpus = KeyTermCorpus(json_dir)
+    try:
+        write_resource_index(corpus.resource_map, json_dir, index_file)
+    except OSError as e:
+        print(f"Error writing resource index {index_file}: {e}")
+    return corpus.resource_map, corpus.raw_documents
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Columnar table of every TipTap text run in a corpus.
+
+The whole corpus is flattened into one row per text run, held column by
+column in typed arrays:
+
+    doc_id         index of the document the run belongs to
+    paragraph_idx  index of the enclosing paragraph within its document, or -1
+    run_text       the run's text
+    mark_type      code into mark_types of the run's first mark, or -1
+    resource_id    code into resource_ids of its resourceReference target, or -1
+    mark_set       code into mark_sets (tuples of the run's mark dictionaries), or -1
+
+The table is built on the compact AST (tiptap_ast.CompactCorpus): each
+document is flattened once into the corpus's node arrays, whose interned
+mark sets are the mark_set codes here. Mark types and resourceIds are
+derived once per mark set rather than once per run. Strings that repeat
+(mark types, resourceIds, mark combinations) are thus dictionary-encoded, so
+corpus-wide questions such as "which runs link a known key term" are
+answered once per distinct value and then applied to the integer column.
+Rows are ordered by document and then by position, so each document's runs
+are a contiguous slice that the renderer can turn back into USFM. With
+pyarrow installed the table exports to Arrow and Parquet.
+
+Run from the repository root to flatten the corpus and print a summary:
+
+    python run_table.py [--pack corpus.pack] [--parquet runs.parquet] [--arrow runs.arrow]
+"""
+import argparse
+import glob
+import os
+from array import array
+from collections import Counter
+from keyterm_corpus import KeyTermCorpus
+from corpus_pack import PackReader, NOTES, KEY_TERMS
+from json_backend import load_document
+from tiptap_ast import CompactCorpus, resource_reference
+
+NOTES_DIR = "./json BiblicaStudyNotes/json/"
+KEY_TERMS_DIR = "./json BiblicaStudyNotesKeyTerms/json/"
+
+class RunTable:
+    """
+    Text runs of many documents in parallel columns.
+
+    Attributes:
+        corpus: The CompactCorpus the documents are flattened into
+        filenames: Input filename of each document, by doc_id
+        names: The name field of each document, by doc_id
+        doc_start: First row of each document (plus a final end entry)
+        mark_types: Mark type names, by mark_type code
+        resource_ids: resourceId strings, by resource_id code
+        mark_sets: Tuples of mark dictionaries, by mark_set code (the corpus's mark set index)
+        run_node: Node index of each run in the corpus
+    """
+
+    def __init__(self):
+        self.corpus = CompactCorpus()
+        self.filenames = self.corpus.names
+        self.names = []
+        self.doc_start = array('I', [0])
+        self.doc_id = array('I')
+        self.paragraph_idx = array('i')
+        self.run_node = array('I')
+        self.run_text = []
+        self.mark_type = array('i')
+        self.resource_id = array('i')
+        self.mark_set = array('i')
+        self.mark_types = []
+        self.resource_ids = []
+        self.mark_sets = []
+        self._mark_type_codes = {}
+        self._resource_codes = {}
+        # mark_type and resource_id codes of each mark set, by mark_set code
+        self._set_mark_type = []
+        self._set_resource_id = []
+
+    def __len__(self):
+        return len(self.run_node)
+
+    @staticmethod
+    def _encode(codes, values, value):
+        # Dictionary-encode a value, adding it to the lookup table on first sight
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _add_mark_sets(self):
+        # Decode the mark sets the corpus interned since the last document, once each
+        corpus = self.corpus
+        for mark_ids in corpus.mark_sets[len(self.mark_sets):]:
+            marks = tuple(corpus.marks[mark_id] for mark_id in mark_ids)
+            mark_type = -1
+            resource_id = -1
+            if marks:
+                mark_type = self._encode(self._mark_type_codes, self.mark_types, marks[0].get('type'))
+                target = resource_reference(marks)
+                if target is not None:
+                    resource_id = self._encode(self._resource_codes, self.resource_ids, target)
+            self.mark_sets.append(marks)
+            self._set_mark_type.append(mark_type)
+            self._set_resource_id.append(resource_id)
+
+    def add_document(self, filename, data):
+        """
+        Append the text runs of one decoded document.
+
+        run_text is filled in by finish(), which build_run_table calls once
+        every document has been added.
+
+        Args:
+            filename: The document's input filename
+            data: The decoded Document
+        """
+        corpus = self.corpus
+        doc_id = corpus.add_document(filename, [content_item.tiptap for content_item in data.content])
+        self.names.append(data.name)
+        self._add_mark_sets()
+
+        node_marks = corpus.node_marks
+        for paragraph, node in corpus.iter_text_nodes(doc_id):
+            mark_set = node_marks[node]
+            self.doc_id.append(doc_id)
+            self.paragraph_idx.append(paragraph)
+            self.run_node.append(node)
+            self.mark_type.append(self._set_mark_type[mark_set] if mark_set >= 0 else -1)
+            self.resource_id.append(self._set_resource_id[mark_set] if mark_set >= 0 else -1)
+            self.mark_set.append(mark_set)
+
+        self.doc_start.append(len(self.run_node))
+        return doc_id
+
+    def finish(self):
+        """
+        Slice the text of runs added since the last call out of the corpus text pool.
+        """
+        corpus = self.corpus
+        corpus.finish()
+        pool = corpus.text_pool
+        text_start = corpus.text_start
+        text_end = corpus.text_end
+        self.run_text.extend(pool[text_start[node]:text_end[node]]
+                             for node in self.run_node[len(self.run_text):])
+
+    def iter_runs(self, doc_id):
+        """
+        Yield (text, marks) for every run of a document in order.
+        """
+        mark_sets = self.mark_sets
+        mark_set = self.mark_set
+        run_text = self.run_text
+        for row in range(self.doc_start[doc_id], self.doc_start[doc_id + 1]):
+            code = mark_set[row]
+            yield run_text[row], mark_sets[code] if code >= 0 else ()
+
+    def iter_paragraph_runs(self, doc_id):
+        """
+        Yield (paragraph, text, marks) for every run of a document in order, like tiptap_ast.iter_runs.
+        """
+        paragraph_idx = self.paragraph_idx
+        for row, (text, marks) in enumerate(self.iter_runs(doc_id), self.doc_start[doc_id]):
+            yield paragraph_idx[row], text, marks
+
+    def linked_rows(self, resource_map):
+        """
+        Return the rows whose resourceReference points at a term in the resource map.
+        """
+        linked = [resource_id in resource_map for resource_id in self.resource_ids]
+        return [row for row, code in enumerate(self.resource_id) if code >= 0 and linked[code]]
+
+    def mark_type_counts(self):
+        """
+        Return the number of runs per first-mark type ('' for unmarked runs).
+        """
+        counts = Counter(self.mark_type)
+        return {(self.mark_types[code] if code >= 0 else ''): count for code, count in counts.items()}
+
+    def resource_counts(self):
+        """
+        Return a Counter of how many runs reference each resourceId.
+        """
+        counts = Counter(code for code in self.resource_id if code >= 0)
+        return Counter({self.resource_ids[code]: count for code, count in counts.items()})
+
+    def to_arrow(self):
+        """
+        Return the run columns as a pyarrow Table with dictionary-encoded string columns.
+        """
+        # Imported here so flattening and rendering never pay pyarrow's import time
+        try:
+            import pyarrow
+        except ImportError:
+            raise RuntimeError("pyarrow is not installed; install it to export Arrow or Parquet")
+
+        def dictionary(codes, values):
+            indices = pyarrow.array([code if code >= 0 else None for code in codes], type=pyarrow.int32())
+            return pyarrow.DictionaryArray.from_arrays(indices, pyarrow.array(values, type=pyarrow.string()))
+
+        return pyarrow.table({
+            'doc_id': pyarrow.array(self.doc_id, type=pyarrow.uint32()),
+            'filename': pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(self.doc_id, type=pyarrow.int32()), pyarrow.array(self.filenames, type=pyarrow.string())),
+            'paragraph_idx': pyarrow.array(self.paragraph_idx, type=pyarrow.int32()),
+            'run_text': pyarrow.array(self.run_text, type=pyarrow.string()),
+            'mark_type': dictionary(self.mark_type, self.mark_types),
+            'resource_id': dictionary(self.resource_id, self.resource_ids),
+        })
+
+    def write_parquet(self, path):
+        """
+        Write the table to a Parquet file (requires pyarrow).
+        """
+        table = self.to_arrow()
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(table, path)
+
+    def write_arrow(self, path):
+        """
+        Write the table to an Arrow IPC file (requires pyarrow).
+        """
+        table = self.to_arrow()
+        import pyarrow.ipc
+        with pyarrow.OSFile(path, 'wb') as sink:
+            with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+def build_run_table(documents):
+    """
+    Flatten decoded documents into a RunTable.
+
+    Args:
+        documents: Iterable of (filename, Document) tuples
+
+    Returns:
+        A RunTable with documents in the given order
+    """
+    table = RunTable()
+    for filename, data in documents:
+        table.add_document(filename, data)
+    table.finish()
+    return table
+
+def main():
+    parser = argparse.ArgumentParser(description="Flatten the corpus into a columnar table of text runs.")
+    parser.add_argument("--pack", help="Read documents from a corpus pack instead of the JSON directories")
+    parser.add_argument("--parquet", help="Write the table to a Parquet file (requires pyarrow)")
+    parser.add_argument("--arrow", help="Write the table to an Arrow IPC file (requires pyarrow)")
+    args = parser.parse_args()
+
+    if args.pack:
+        with PackReader(args.pack) as pack:
+            documents = pack.documents(NOTES) + pack.documents(KEY_TERMS)
+            resource_map = KeyTermCorpus.from_pack(pack).resource_map
+    else:
+        corpus = KeyTermCorpus(KEY_TERMS_DIR)
+        resource_map = corpus.resource_map
+        documents = []
+        for json_file in sorted(glob.glob(os.path.join(NOTES_DIR, "*.json"))):
+            try:
+                documents.append((os.path.basename(json_file), load_document(json_file)))
+            except Exception as e:
+                print(f"Error processing {json_file}: {e}")
+        documents += [(os.path.basename(path), data) for path, data in corpus.documents]
+
+    table = build_run_table(documents)
+    print(f"Flattened {len(table.filenames)} documents into {len(table)} text runs")
+    for mark_type, count in sorted(table.mark_type_counts().items()):
+        print(f"  {mark_type or '(unmarked)'}: {count}")
+    print(f"Runs linking a known key term: {len(table.linked_rows(resource_map))}")
+    print(f"Distinct resourceIds referenced: {len(table.resource_ids)}")
+
+    for path, write in ((args.parquet, table.write_parquet), (args.arrow, table.write_arrow)):
+        if path:
+            try:
+                write(path)
+                print(f"Run table written to {path}")
+            except Exception as e:
+                print(f"Error writing {path}: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Structured Scripture reference parsing with canonical integer verse keys.
+
+A verse key packs book, chapter and verse into one integer, BBCCCVVV:
+
+    verse_key(1, 2, 4)  == 1002004    # Genesis 2:4
+    verse_key(66, 22, 21) == 66022021 # Revelation 22:21
+
+Keys sort in canonical order, so range checks and ordering are plain integer
+comparisons. A reference without verses covers its whole chapter(s): it
+starts at verse 1 and ends at END_OF_CHAPTER. References whose chapter or
+verse would not fit its three digits (or would be END_OF_CHAPTER), or whose
+range ends before it starts, are rejected rather than packed into a key
+that belongs to another verse.
+
+parse_reference() turns one reference string ("Genesis 2:4–3:24",
+"Hebrews chapters 3 and 4", "Psalm 95") into a ScriptureReference and is
+memoized, since the same references recur across notes.
+"""
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Canonical book names in canonical order; the book number is the 1-based position
+BOOK_NAMES = (
+    "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy",
+    "Joshua", "Judges", "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings",
+    "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah", "Esther", "Job",
+    "Psalms", "Proverbs", "Ecclesiastes", "Song of Solomon",
+    "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel", "Hosea", "Joel",
+    "Amos", "Obadiah", "Jonah", "Micah", "Nahum", "Habakkuk", "Zephaniah", "Haggai",
+    "Zechariah", "Malachi", "Matthew", "Mark", "Luke", "John", "Acts", "Romans",
+    "1 Corinthians", "2 Corinthians", "Galatians", "Ephesians", "Philippians",
+    "Colossians", "1 Thessalonians", "2 Thessalonians", "1 Timothy", "2 Timothy",
+    "Titus", "Philemon", "Hebrews", "James", "1 Peter", "2 Peter", "1 John", "2 John",
+    "3 John", "Jude", "Revelation"
+)
+
+# USFM book IDs, in the same order
+BOOK_IDS = (
+    "GEN", "EXO", "LEV", "NUM", "DEU", "JOS", "JDG", "RUT", "1SA", "2SA", "1KI", "2KI",
+    "1CH", "2CH", "EZR", "NEH", "EST", "JOB", "PSA", "PRO", "ECC", "SNG", "ISA", "JER",
+    "LAM", "EZK", "DAN", "HOS", "JOL", "AMO", "OBA", "JON", "MIC", "NAM", "HAB", "ZEP",
+    "HAG", "ZEC", "MAL", "MAT", "MRK", "LUK", "JHN", "ACT", "ROM", "1CO", "2CO", "GAL",
+    "EPH", "PHP", "COL", "1TH", "2TH", "1TI", "2TI", "TIT", "PHM", "HEB", "JAS", "1PE",
+    "2PE", "1JN", "2JN", "3JN", "JUD", "REV"
+)
+
+BOOK_NUMBERS = {name: number for number, name in enumerate(BOOK_NAMES, 1)}
+BOOK_NUMBERS.update({"Psalm": 19, "Song of Songs": 22})
+BOOK_NUMBERS.update({book_id: number for number, book_id in enumerate(BOOK_IDS, 1)})
+
+# Verse number used as the end of a reference that covers whole chapters; real verses stay below it
+END_OF_CHAPTER = 999
+
+# Obadiah, Philemon, 2 John, 3 John and Jude: a bare number after the book is a verse
+SINGLE_CHAPTER_BOOKS = frozenset((31, 57, 63, 64, 65))
+
+ScriptureReference = namedtuple('ScriptureReference', ['book', 'start_key', 'end_key'])
+
+def verse_key(book, chapter, verse):
+    """
+    Pack a book number, chapter and verse into a BBCCCVVV integer.
+    """
+    return book * 1000000 + chapter * 1000 + verse
+
+def split_key(key):
+    """
+    Unpack a BBCCCVVV integer into (book, chapter, verse).
+    """
+    return key // 1000000, key // 1000 % 1000, key % 1000
+
+def book_number(name):
+    """
+    Return the book number (1-66) for a book name, alias or USFM ID, or None.
+    """
+    return BOOK_NUMBERS.get(name)
+
+def format_key(key):
+    """
+    Return a readable reference for a verse key, e.g. 'Genesis 2:4'.
+    """
+    book, chapter, verse = split_key(key)
+    if verse == END_OF_CHAPTER:
+        return f"{BOOK_NAMES[book - 1]} {chapter}"
+    return f"{BOOK_NAMES[book - 1]} {chapter}:{verse}"
+
+def key_from_mark_verse(value):
+    """
+    Convert a bibleReference mark verse ('1BBBCCCVVV', e.g. '1027002001') to a verse key.
+
+    Returns:
+        The verse key, or None if the value is not a well-formed verse of a known book
+    """
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    if not 1000000000 <= value < 2000000000:
+        return None
+    book, chapter, verse = value // 1000000 % 1000, value // 1000 % 1000, value % 1000
+    if not (1 <= book <= len(BOOK_NAMES) and chapter >= 1 and 1 <= verse < END_OF_CHAPTER):
+        return None
+    return verse_key(book, chapter, verse)
+
+# Book names are tried longest first so "1 John" wins over "John" and "Psalms" over "Psalm"
+_BOOK_PATTERN = "|".join(re.escape(name) for name in sorted(BOOK_NUMBERS, key=len, reverse=True)
+                         if not name.isupper())
+_DASH = r"[-\u2010-\u2015\u2212]"
+
+_REFERENCE_PATTERN = re.compile(
+    rf"(?<![\w])(?P<book>{_BOOK_PATTERN})"
+    r"(?:"
+    r" chapters (?P<chapters_first>\d+) and (?P<chapters_second>\d+)"
+    r"| chapter (?P<chapter_only>\d+)"
+    rf"| (?P<chapter>\d+)(?::(?P<verse>\d+))?(?:\s*{_DASH}\s*(?P<end_a>\d+)(?::(?P<end_b>\d+))?)?"
+    r")(?!\d)"
+)
+
+def _reference(book, chapter, verse, end_chapter, end_verse):
+    # A key only stays unambiguous while chapter and verse fit their three digits
+    if not (1 <= chapter < 1000 and 1 <= end_chapter < 1000):
+        return None
+    if not (1 <= verse < END_OF_CHAPTER and 1 <= end_verse <= END_OF_CHAPTER):
+        return None
+    start_key = verse_key(book, chapter, verse)
+    end_key = verse_key(book, end_chapter, end_verse)
+    if end_key < start_key:
+        return None
+    return ScriptureReference(book, start_key, end_key)
+
+def _reference_from_match(match):
+    book = BOOK_NUMBERS[match.group('book')]
+    if match.group('chapters_first'):
+        first, second = int(match.group('chapters_first')), int(match.group('chapters_second'))
+        if second != first + 1:
+            # "chapters 3 and 7" names two chapters, not the range between them
+            return None
+        return _reference(book, first, 1, second, END_OF_CHAPTER)
+    if match.group('chapter_only'):
+        chapter = int(match.group('chapter_only'))
+        return _reference(book, chapter, 1, chapter, END_OF_CHAPTER)
+
+    chapter = int(match.group('chapter'))
+    verse = match.group('verse')
+    end_a = match.group('end_a')
+    end_b = match.group('end_b')
+    if verse is None and book in SINGLE_CHAPTER_BOOKS:
+        # "Jude 5" or "Jude 5-7": the numbers are verses of the only chapter
+        if end_b:
+            return None
+        return _reference(book, 1, chapter, 1, int(end_a) if end_a else chapter)
+    if verse is None:
+        # "Hebrews 3" or "Hebrews 3-4": whole chapters
+        end_chapter = int(end_a) if end_a else chapter
+        if end_b:
+            return _reference(book, chapter, 1, end_chapter, int(end_b))
+        return _reference(book, chapter, 1, end_chapter, END_OF_CHAPTER)
+
+    verse = int(verse)
+    if end_a is None:
+        return _reference(book, chapter, verse, chapter, verse)
+    if end_b is None:
+        # "2:4-7" ends in the same chapter
+        return _reference(book, chapter, verse, chapter, int(end_a))
+    return _reference(book, chapter, verse, int(end_a), int(end_b))
+
+@lru_cache(maxsize=8192)
+def parse_reference(text):
+    """
+    Parse one reference string.
+
+    Args:
+        text: e.g. 'Genesis 2', 'Genesis 2:4', 'Genesis 2:4–3:24', 'Hebrews chapters 3 and 4'
+
+    Returns:
+        A ScriptureReference, or None if the text is not exactly one reference
+    """
+    match = _REFERENCE_PATTERN.fullmatch(text.strip())
+    if match is None:
+        return None
+    return _reference_from_match(match)
+
+@lru_cache(maxsize=8192)
+def parse_passage_filename(filename):
+    """
+    Parse a study note filename such as 'Genesis_45_16_50_26_133084.json'.
+
+    The trailing number is the document ID. The passage is either
+    chapter_verse_endverse (same chapter) or chapter_verse_endchapter_endverse.
+
+    Returns:
+        A ScriptureReference, or None if the filename does not name a passage
+    """
+    parts = os.path.splitext(os.path.basename(filename))[0].split('_')
+    numbers = []
+    while parts and parts[-1].isdigit():
+        numbers.insert(0, int(parts.pop()))
+    book = BOOK_NUMBERS.get(" ".join(parts))
+    if book is None or len(numbers) < 2:
+        return None
+    # Drop the document ID
+    numbers = numbers[:-1]
+    if len(numbers) == 3:
+        chapter, verse, end_verse = numbers
+        return _reference(book, chapter, verse, chapter, end_verse)
+    if len(numbers) == 4:
+        chapter, verse, end_chapter, end_verse = numbers
+        return _reference(book, chapter, verse, end_chapter, end_verse)
+    if len(numbers) == 2:
+        chapter, verse = numbers
+        return _reference(book, chapter, verse, chapter, verse)
+    if len(numbers) == 1:
+        chapter = numbers[0]
+        return _reference(book, chapter, 1, chapter, END_OF_CHAPTER)
+    return None
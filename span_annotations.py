@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Span annotation: detectors propose replacements, the text is rebuilt once.
+
+A detector is any function that takes a text and returns Span(start, end,
+replacement, priority) tuples describing what it would replace; it never
+modifies the text itself. resolve_spans() keeps the spans that do not
+overlap a higher-priority span (a lower priority number wins, then the
+leftmost span), and apply_spans() builds the output in a single join. Since
+detectors only ever see the original text, none of them can match inside
+markup another one inserted, and a stretch of text is never tagged twice.
+"""
+from bisect import bisect_left
+from collections import namedtuple
+
+Span = namedtuple('Span', ['start', 'end', 'replacement', 'priority'])
+
+def resolve_spans(spans):
+    """
+    Drop spans that overlap a span with higher priority.
+
+    Spans are accepted in order of (priority, start); a span is dropped if it
+    overlaps one already accepted.
+
+    Args:
+        spans: Iterable of Span tuples
+
+    Returns:
+        The accepted spans, sorted by start
+    """
+    starts = []
+    accepted = []
+    for span in sorted(spans, key=lambda span: (span.priority, span.start)):
+        i = bisect_left(starts, span.start)
+        if i > 0 and accepted[i - 1].end > span.start:
+            continue
+        if i < len(starts) and starts[i] < span.end:
+            continue
+        starts.insert(i, span.start)
+        accepted.insert(i, span)
+    return accepted
+
+def apply_spans(text, spans):
+    """
+    Rebuild the text with non-overlapping spans replaced.
+
+    Args:
+        text: The original text
+        spans: Non-overlapping spans sorted by start (as returned by resolve_spans)
+    """
+    if not spans:
+        return text
+    parts = []
+    position = 0
+    for span in spans:
+        parts.append(text[position:span.start])
+        parts.append(span.replacement)
+        position = span.end
+    parts.append(text[position:])
+    return "".join(parts)
+
+def annotate(text, detectors):
+    """
+    Run every detector over the text, resolve overlaps and rebuild the text once.
+
+    Args:
+        text: The text to annotate
+        detectors: Functions mapping a text to a list of Span tuples
+    """
+    spans = []
+    for detector in detectors:
+        spans.extend(detector(text))
+    return apply_spans(text, resolve_spans(spans))
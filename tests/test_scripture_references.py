@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Golden-output tests for format_scripture_references.
+
+The original rule-by-rule implementation (seven str.replace calls followed by
+one re.sub per book for each of three patterns) is kept here as the golden
+reference. The single-pass detector must give exactly the same output on
+every text segment of the corpus, on strings where rules overlap and the
+original's order of application decides the result, and on randomly
+assembled strings of book names, chapter words and numbers.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+import glob
+import os
+import random
+import re
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+import pytest
+
+from json_backend import load_document
+from keyterm_corpus import build_resource_map
+from reference_detector import BIBLE_BOOKS
+from tiptap_render import TiptapRenderer
+from usfm_common import format_scripture_references
+
+NOTES_DIR = os.path.join(ROOT, "json BiblicaStudyNotes", "json")
+KEY_TERMS_DIR = os.path.join(ROOT, "json BiblicaStudyNotesKeyTerms", "json")
+
+OVERLAP_CASES = [
+    "the book of Judges 5 says",
+    "the book of Genesis chapter 2 and the book of Exodus chapters 3 and 4",
+    "1 John chapter 3, 2 John chapters 1 and 2, the book of 1 John",
+    "the book of Psalms, Psalms chapter 23, Psalm 95 and Psalm 950",
+    "Remark chapter 2 and Truth chapter 3",
+    "Exodus 3:14, Exodus 34:6, Luke 8:31, Acts 25-26 and Zechariah 8",
+    "book of Song of Songs chapter 1 and the book of Song of Solomon",
+]
+
+# Pieces the random cases are assembled from: every rule's trigger words plus near misses
+FUZZ_FRAGMENTS = [
+    "book of ", "the book of ", "chapter ", "chapters ", " and ", "and ", ", ", ": ", "-", " ", "1", "2 ",
+    "Exodus 3:14", "Exodus 34:6", "Luke 8:31", "Psalm 95", "Acts 25-26", "Judges 5", "Zechariah 8",
+    "Psalm", "Song of ", "John", "Re", "mark", "Truth ", "chapter", "\\xt ", "\\xt*",
+]
+FUZZ_CASES = 2000
+
+def legacy_format_scripture_references(text):
+    """
+    The original implementation, kept as the golden reference.
+    """
+    text = text.replace("Exodus 3:14", "\\xt Exodus 3:14\\xt*")
+    text = text.replace("Luke 8:31", "\\xt Luke 8:31\\xt*")
+    text = text.replace("Psalm 95", "\\xt Psalm 95\\xt*")
+    text = text.replace("Acts 25-26", "\\xt Acts 25-26\\xt*")
+    text = text.replace("Judges 5", "\\xt Judges 5\\xt*")
+    text = text.replace("Zechariah 8", "\\xt Zechariah 8\\xt*")
+    text = text.replace("Exodus 34:6", "\\xt Exodus 34:6\\xt*")
+
+    for book in BIBLE_BOOKS:
+        pattern = f"{book} chapter (\\d+)"
+        text = re.sub(pattern, f"\\\\xt {book} \\1\\\\xt*", text)
+
+    for book in BIBLE_BOOKS:
+        pattern = f"{book} chapters (\\d+) and (\\d+)"
+        text = re.sub(pattern, f"\\\\xt {book} \\1-\\2\\\\xt*", text)
+
+    for book in BIBLE_BOOKS:
+        pattern = f"book of {book}"
+        text = re.sub(pattern, f"book of \\\\xt {book}\\\\xt*", text)
+
+    return text
+
+def corpus_files():
+    return sorted(glob.glob(os.path.join(NOTES_DIR, "*.json")) + glob.glob(os.path.join(KEY_TERMS_DIR, "*.json")))
+
+def fuzz_cases(seed=17, count=FUZZ_CASES):
+    rng = random.Random(seed)
+    pieces = FUZZ_FRAGMENTS + list(BIBLE_BOOKS) + [book + " " for book in BIBLE_BOOKS]
+    cases = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(2, 12)):
+            if rng.random() < 0.25:
+                parts.append(str(rng.randint(0, 1200)))
+            else:
+                parts.append(rng.choice(pieces))
+        cases.append("".join(parts))
+    return cases
+
+@pytest.mark.parametrize("text", OVERLAP_CASES)
+def test_overlap_cases_match_legacy(text):
+    assert format_scripture_references(text) == legacy_format_scripture_references(text)
+
+def test_random_cases_match_legacy():
+    for text in fuzz_cases():
+        assert format_scripture_references(text) == legacy_format_scripture_references(text), text
+
+@pytest.mark.skipif(not corpus_files(), reason="corpus JSON not available")
+def test_corpus_renders_like_legacy():
+    resource_map = build_resource_map(KEY_TERMS_DIR)
+    current = TiptapRenderer(resource_map)
+    golden = TiptapRenderer(resource_map, text_filter=legacy_format_scripture_references)
+    for json_file in corpus_files():
+        tiptap_content = [item.tiptap for item in load_document(json_file).content]
+        assert current.render_to_string(tiptap_content) == golden.render_to_string(tiptap_content), json_file
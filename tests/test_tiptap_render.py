@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Regression tests for rendering deeply nested TipTap documents.
+
+The converters once walked TipTap trees recursively, and a deeply nested
+note hit Python's recursion limit. TiptapRenderer and tiptap_ast.iter_runs
+walk with explicit stacks, so nesting depth must not matter.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from tiptap_ast import iter_runs
+from tiptap_render import TiptapRenderer
+
+DEPTH = 10 ** 5
+
+def nested_document(depth):
+    node = {"type": "text", "text": "inner ",
+            "marks": [{"type": "resourceReference", "attrs": {"resourceId": "1"}}]}
+    for _ in range(depth):
+        node = {"type": "paragraph", "content": [node, {"type": "text", "text": "x"}]}
+    return {"type": "doc", "content": [node]}
+
+def test_render_deeply_nested_document():
+    renderer = TiptapRenderer({"1": "term"}, text_filter=str)
+    usfm = renderer.render_to_string(nested_document(DEPTH))
+    assert usfm == "\\k inner \\k*" + "x" * DEPTH
+
+def test_render_runs_of_deeply_nested_document():
+    renderer = TiptapRenderer({"1": "term"}, text_filter=str)
+    out = io.StringIO()
+    renderer.render_runs(((text, marks) for _, text, marks in iter_runs(nested_document(DEPTH))), out)
+    assert out.getvalue() == "\\k inner \\k*" + "x" * DEPTH
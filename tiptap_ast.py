@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Compact struct-of-arrays representation of TipTap content.
+
+Every node of every document is stored in preorder in a handful of parallel
+typed arrays instead of as nested dicts and lists:
+
+    node_type   code into type_names ('doc', 'paragraph', 'text', ...)
+    node_end    index one past the node's last descendant (its child range)
+    text_start  start offset of the node's text in the shared text pool
+    text_end    end offset, or -1 for nodes without text
+    node_marks  index into mark_sets (tuples of mark ids), or -1
+
+Marks are interned: identical marks (same type and attrs) share one entry in
+the marks table, and identical combinations of marks share one mark set.
+All text lives in a single string. Because nodes are in preorder, walking a
+document's text runs in order is a linear scan of its node range, and the
+whole corpus pickles as a few arrays and strings.
+
+iter_runs() is the one walk over a TipTap dict tree that yields its text
+runs, for rendering and the key term concordance; iter_text_nodes() yields
+the same runs from the compact arrays, for run_table.RunTable.
+"""
+import json
+from array import array
+
+def iter_runs(tiptap_content):
+    """
+    Yield (paragraph, text, marks) for every text node of a TipTap tree in document order.
+
+    A text node is a leaf, even if it also carries content. paragraph is the
+    index of the enclosing paragraph within the tree (counted in document
+    order), or -1 for text outside any paragraph; marks is the node's list of
+    mark dictionaries, or an empty tuple if it has none.
+
+    Args:
+        tiptap_content: A TipTap node, or a list of nodes (e.g. every content item's tree)
+    """
+    paragraphs = 0
+    stack = [(tiptap_content, -1)]
+    while stack:
+        node, paragraph = stack.pop()
+        if isinstance(node, list):
+            # Children are pushed in reverse so they pop in document order
+            stack.extend((child, paragraph) for child in reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+
+        if 'text' in node:
+            yield paragraph, node['text'], node.get('marks') or ()
+            continue
+        if node.get('type') == 'paragraph':
+            paragraph = paragraphs
+            paragraphs += 1
+        if 'content' in node:
+            stack.extend((child, paragraph) for child in reversed(node['content']))
+
+def resource_reference(marks):
+    """
+    Return the resourceId a run's resourceReference mark links to (as a string), or None.
+    """
+    for mark in marks:
+        if mark.get('type') == 'resourceReference':
+            target = mark.get('attrs', {}).get('resourceId')
+            return str(target) if target is not None else None
+    return None
+
+class CompactCorpus:
+    """
+    TipTap content of many documents packed into parallel arrays.
+
+    Attributes:
+        names: Document names (e.g. filenames), by document index
+        type_names: Node type names, by type code
+        marks: Interned mark dictionaries, by mark id
+        mark_sets: Tuples of mark ids, by mark set index
+        doc_start: Node index where each document starts (plus a final end entry)
+    """
+
+    __slots__ = ('names', 'type_names', 'marks', 'mark_sets', 'doc_start',
+                 'node_type', 'node_end', 'text_start', 'text_end', 'node_marks',
+                 'text_pool', '_type_codes', '_mark_ids', '_mark_set_ids', '_pool_parts', '_pool_size')
+
+    def __init__(self):
+        self.names = []
+        self.type_names = []
+        self.marks = []
+        self.mark_sets = []
+        self.doc_start = array('I', [0])
+        self.node_type = array('H')
+        self.node_end = array('I')
+        self.text_start = array('I')
+        self.text_end = array('i')
+        self.node_marks = array('i')
+        self.text_pool = ""
+        self._type_codes = {}
+        self._mark_ids = {}
+        self._mark_set_ids = {}
+        self._pool_parts = []
+        self._pool_size = 0
+
+    def __getstate__(self):
+        self.finish()
+        return {
+            'names': self.names,
+            'type_names': self.type_names,
+            'marks': self.marks,
+            'mark_sets': self.mark_sets,
+            'doc_start': self.doc_start,
+            'node_type': self.node_type,
+            'node_end': self.node_end,
+            'text_start': self.text_start,
+            'text_end': self.text_end,
+            'node_marks': self.node_marks,
+            'text_pool': self.text_pool,
+        }
+
+    def __setstate__(self, state):
+        self.__init__()
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._type_codes = {name: code for code, name in enumerate(self.type_names)}
+        self._mark_ids = {self._mark_key(mark): mark_id for mark_id, mark in enumerate(self.marks)}
+        self._mark_set_ids = {mark_set: index for index, mark_set in enumerate(self.mark_sets)}
+        self._pool_size = len(self.text_pool)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _mark_key(mark):
+        return json.dumps(mark, sort_keys=True, ensure_ascii=False)
+
+    def _type_code(self, type_name):
+        code = self._type_codes.get(type_name)
+        if code is None:
+            code = self._type_codes[type_name] = len(self.type_names)
+            self.type_names.append(type_name)
+        return code
+
+    def _mark_set(self, marks):
+        mark_ids = []
+        for mark in marks:
+            key = self._mark_key(mark)
+            mark_id = self._mark_ids.get(key)
+            if mark_id is None:
+                mark_id = self._mark_ids[key] = len(self.marks)
+                self.marks.append(mark)
+            mark_ids.append(mark_id)
+
+        mark_set = tuple(mark_ids)
+        index = self._mark_set_ids.get(mark_set)
+        if index is None:
+            index = self._mark_set_ids[mark_set] = len(self.mark_sets)
+            self.mark_sets.append(mark_set)
+        return index
+
+    def add_document(self, name, tiptap_content):
+        """
+        Append one document's TipTap content.
+
+        Args:
+            name: Name stored for the document (e.g. its filename)
+            tiptap_content: A TipTap node, or a list of nodes (e.g. every content item's tree)
+
+        Returns:
+            The index of the new document
+        """
+        # Each stack entry is a node to emit, or an int marking where an open node's subtree ends
+        stack = [tiptap_content]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, int):
+                self.node_end[node] = len(self.node_type)
+            elif isinstance(node, list):
+                stack.extend(reversed(node))
+            elif isinstance(node, dict):
+                index = len(self.node_type)
+                self.node_type.append(self._type_code(node.get('type')))
+                self.node_end.append(index + 1)
+                marks = node.get('marks')
+                self.node_marks.append(self._mark_set(marks) if marks else -1)
+
+                # A text node is a leaf, even if it also carries content
+                if 'text' in node:
+                    text = node['text']
+                    self.text_start.append(self._pool_size)
+                    self.text_end.append(self._pool_size + len(text))
+                    self._pool_parts.append(text)
+                    self._pool_size += len(text)
+                    continue
+
+                self.text_start.append(0)
+                self.text_end.append(-1)
+                if 'content' in node:
+                    stack.append(index)
+                    stack.extend(reversed(node['content']))
+
+        self.names.append(name)
+        self.doc_start.append(len(self.node_type))
+        return len(self.names) - 1
+
+    def finish(self):
+        """
+        Join pending text into the shared pool; called automatically before reads.
+        """
+        if self._pool_parts:
+            self.text_pool = self.text_pool + "".join(self._pool_parts)
+            self._pool_parts = []
+
+    def node_range(self, doc_index):
+        """
+        Return the (start, end) node indexes of a document.
+        """
+        return self.doc_start[doc_index], self.doc_start[doc_index + 1]
+
+    def children(self, node_index):
+        """
+        Yield the indexes of a node's direct children.
+        """
+        child = node_index + 1
+        end = self.node_end[node_index]
+        while child < end:
+            yield child
+            child = self.node_end[child]
+
+    def iter_text_runs(self, doc_index):
+        """
+        Yield (text, marks) for every text node of a document in order.
+
+        marks is a tuple of the node's mark dictionaries (empty if unmarked).
+        """
+        self.finish()
+        pool = self.text_pool
+        marks = self.marks
+        mark_sets = self.mark_sets
+        text_start = self.text_start
+        text_end = self.text_end
+        node_marks = self.node_marks
+        start, end = self.node_range(doc_index)
+        for i in range(start, end):
+            run_end = text_end[i]
+            if run_end < 0:
+                continue
+            mark_set = node_marks[i]
+            run_marks = tuple(marks[mark_id] for mark_id in mark_sets[mark_set]) if mark_set >= 0 else ()
+            yield pool[text_start[i]:run_end], run_marks
+
+    def iter_text_nodes(self, doc_index):
+        """
+        Yield (paragraph, node_index) for every text node of a document in order.
+
+        paragraph is numbered as in iter_runs: the index of the enclosing
+        paragraph within the document, or -1 outside any paragraph.
+        """
+        paragraph_code = self._type_codes.get('paragraph')
+        node_type = self.node_type
+        node_end = self.node_end
+        text_end = self.text_end
+        open_paragraphs = []
+        paragraphs = 0
+        start, end = self.node_range(doc_index)
+        for i in range(start, end):
+            while open_paragraphs and open_paragraphs[-1][0] <= i:
+                open_paragraphs.pop()
+            if text_end[i] >= 0:
+                yield (open_paragraphs[-1][1] if open_paragraphs else -1), i
+            elif node_type[i] == paragraph_code:
+                open_paragraphs.append((node_end[i], paragraphs))
+                paragraphs += 1
+
+    def plain_text(self, doc_index):
+        """
+        Return a document's text with no markup.
+        """
+        return "".join(text for text, _ in self.iter_text_runs(doc_index))
+
+def build_compact_corpus(documents):
+    """
+    Build a CompactCorpus from decoded documents.
+
+    Args:
+        documents: Iterable of (name, Document) tuples
+
+    Returns:
+        A finished CompactCorpus with documents in the given order
+    """
+    corpus = CompactCorpus()
+    for name, data in documents:
+        corpus.add_document(name, [content_item.tiptap for content_item in data.content])
+    corpus.finish()
+    return corpus
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Table-driven TipTap renderer that writes USFM straight into an output stream.
+
+Node handlers are keyed by node type and mark handlers by mark type, so
+supporting a new node or mark means adding one table entry. Plain text runs
+are buffered until the next marked run (or the end of the document) and
+passed through the text filter (Scripture reference formatting) as one
+segment; no reference pattern can match across a \\k marker, so this gives
+the same output as formatting the whole note at once.
+
+Runs carrying a bibleReference mark are already known to be references, so
+they are written as \\xt directly and never reach the regex filter. The
+mark's verse ranges are checked first (see scripture_refs.key_from_mark_verse);
+a mark without valid ranges leaves its run to the filter like plain text.
+"""
+import io
+from scripture_refs import key_from_mark_verse
+from usfm_common import format_scripture_references
+
+# Bump whenever what is rendered for a document (its USFM or result tuple) changes, so cached renders are discarded
+RENDERER_VERSION = 4
+
+def _valid_verse_range(verse_range):
+    # A bibleReference verse range: {'startVerse': '1BBBCCCVVV', 'endVerse': ...}
+    if not isinstance(verse_range, dict):
+        return False
+    start_key = key_from_mark_verse(verse_range.get('startVerse'))
+    end_key = key_from_mark_verse(verse_range.get('endVerse', verse_range.get('startVerse')))
+    return start_key is not None and end_key is not None and start_key <= end_key
+
+class TiptapRenderer:
+    """
+    Render TipTap trees to USFM using handler tables.
+
+    Attributes:
+        resource_map: A dictionary mapping resourceId to term names
+        text_filter: Function applied to every text segment before it is written
+        node_handlers: node type -> handler(node, stack)
+        mark_handlers: mark type -> handler(mark, text) returning the rendered run, or None
+            to leave the text unmarked
+    """
+
+    def __init__(self, resource_map=None, text_filter=format_scripture_references):
+        self.resource_map = resource_map
+        self.text_filter = text_filter
+        self.node_handlers = {
+            'doc': self._render_children,
+            'paragraph': self._render_children,
+            'text': self._render_text,
+        }
+        self.mark_handlers = {
+            'resourceReference': self._resource_reference,
+            'bibleReference': self._bible_reference,
+            'textStyle': None,
+        }
+        self._out = None
+        self._pending = []
+
+    def _resource_reference(self, mark, text):
+        resource_id = mark.get('attrs', {}).get('resourceId')
+        if self.resource_map and resource_id in self.resource_map:
+            # Format as a USFM key term reference
+            return f"\\k {self.text_filter(text)}\\k*"
+        return None
+
+    def _bible_reference(self, mark, text):
+        verses = (mark.get('attrs') or {}).get('verses')
+        if verses and text.strip() and all(_valid_verse_range(verse_range) for verse_range in verses):
+            # Format as a USFM cross-reference without rescanning the text
+            return f"\\xt {text}\\xt*"
+        return None
+
+    def _render_children(self, node, stack):
+        if 'text' in node:
+            self._render_text(node, stack)
+        elif 'content' in node:
+            # Children are pushed in reverse so they pop in document order
+            stack.extend(reversed(node['content']))
+
+    def _render_text(self, node, stack):
+        if 'text' not in node:
+            self._render_children(node, stack)
+            return
+
+        self._render_run(node['text'], node.get('marks') or ())
+
+    def _render_run(self, text, marks):
+        for mark in marks:
+            handler = self.mark_handlers.get(mark.get('type'))
+            rendered = handler(mark, text) if handler is not None else None
+            if rendered is not None:
+                self._flush()
+                self._out.write(rendered)
+                return
+
+        self._pending.append(text)
+
+    def _flush(self):
+        if self._pending:
+            self._out.write(self.text_filter("".join(self._pending)))
+            self._pending = []
+
+    def render(self, tiptap_content, out):
+        """
+        Render a TipTap node, or a list of nodes, into a text stream.
+
+        Args:
+            tiptap_content: The TipTap content to process
+            out: Any object with a write(str) method
+        """
+        self._out = out
+        self._pending = []
+        try:
+            stack = [tiptap_content]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, dict):
+                    self.node_handlers.get(node.get('type'), self._render_children)(node, stack)
+                elif isinstance(node, list):
+                    stack.extend(reversed(node))
+            self._flush()
+        finally:
+            self._out = None
+            self._pending = []
+
+    def render_runs(self, runs, out):
+        """
+        Render a document given as its text runs, in order, into a text stream.
+
+        Args:
+            runs: Iterable of (text, marks) tuples, marks being a sequence of mark dictionaries
+            out: Any object with a write(str) method
+        """
+        self._out = out
+        self._pending = []
+        try:
+            for text, marks in runs:
+                self._render_run(text, marks)
+            self._flush()
+        finally:
+            self._out = None
+            self._pending = []
+
+    def render_compact(self, corpus, doc_index, out):
+        """
+        Render one document of a tiptap_ast.CompactCorpus into a text stream.
+
+        Args:
+            corpus: The CompactCorpus holding the document
+            doc_index: Index of the document in the corpus
+            out: Any object with a write(str) method
+        """
+        self.render_runs(corpus.iter_text_runs(doc_index), out)
+
+    def render_to_string(self, tiptap_content):
+        """
+        Render TipTap content and return the USFM text.
+        """
+        out = io.StringIO()
+        self.render(tiptap_content, out)
+        return out.getvalue()
+
+_cached_renderer = None
+
+def get_renderer(resource_map):
+    """
+    Return a renderer for a resource map, reusing the last one built for the same map.
+    """
+    global _cached_renderer
+    if _cached_renderer is None or _cached_renderer.resource_map is not resource_map:
+        _cached_renderer = TiptapRenderer(resource_map)
+    return _cached_renderer
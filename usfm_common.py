@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Scripture reference formatting and study note backlinks shared by both converters.
+"""
+from reference_detector import get_detector
+from span_annotations import annotate
+from concordance import read_concordance, default_concordance_path
+from verse_index import format_passage, read_verse_index, default_index_path
+from verse_table import note_id
+
+def format_scripture_references(text):
+    """
+    Find and format Scripture references in the text.
+    
+    The reference detector proposes a replacement span for every rule match
+    in one pass; overlapping spans are resolved by rule priority and the text
+    is rebuilt once.
+    
+    Args:
+        text: The text to process
+    
+    Returns:
+        Text with Scripture references formatted as USFM cross-references
+    """
+    return annotate(text, [get_detector().spans])
+
+def load_backlinks(notes_output_dir):
+    """
+    Map every key term to the study note passages that link it.
+    
+    Built from the concordance and verse index the study note conversion
+    writes next to the book files, so no note is decoded or walked again.
+    
+    Args:
+        notes_output_dir: Directory the study note book files were written to
+    
+    Returns:
+        Dictionary mapping resourceId to a list of passages in canonical order,
+        or None if the concordance or verse index is missing or unreadable
+    """
+    concordance = read_concordance(default_concordance_path(notes_output_dir))
+    index = read_verse_index(default_index_path(notes_output_dir))
+    if concordance is None or index is None:
+        return None
+    
+    # Notes whose passage cannot be parsed are not in the verse index and have nothing to link to
+    passages = {}
+    for i in range(len(index)):
+        entry = index.entry(i)
+        passages[note_id(entry.filename)] = (entry.start_key, entry.end_key)
+    
+    backlinks = {}
+    for resource_id in concordance.resource_ids:
+        linked = sorted({passages[note] for note in concordance.notes(resource_id) if note in passages})
+        if linked:
+            backlinks[resource_id] = [format_passage(start_key, end_key, dash="-") for start_key, end_key in linked]
+    return backlinks
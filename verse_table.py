@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Dense per-verse table of the study notes covering each verse.
+
+The table has one row for every verse of the versification (see
+versification; 31,102 verses), stored in CSR layout. offsets is a uint32
+array of TOTAL_VERSES + 1 entries, and note_ids is a flat int32 array of
+note IDs (the number at the end of a study note filename). The notes
+covering the verse with ordinal o are note_ids[offsets[o]:offsets[o + 1]].
+
+The file is a small header followed by the two arrays, little-endian and
+4-byte aligned. read_verse_table() memory-maps it and views the arrays in
+place, so opening the table costs no parsing and a lookup is two array
+indexings. The study note conversion writes the table next to the book
+files, together with the verse index.
+
+Run from the repository root to look up verses:
+
+    python verse_table.py "Genesis 46:3" "3 John 1:14"
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from scripture_refs import format_key, parse_reference
+from versification import TOTAL_VERSES, key_from_ordinal, verse_ordinal
+
+MAGIC = b'BNXVTBL1'
+TABLE_FILENAME = "verse_notes.tbl"
+DEFAULT_TABLE_FILE = os.path.join("./usfm_study_notes/", TABLE_FILENAME)
+
+_HEADER = struct.Struct('<8sII')
+
+def default_table_path(output_dir):
+    """
+    Return the verse table path for a study note output directory.
+    """
+    return os.path.join(output_dir, TABLE_FILENAME)
+
+def note_id(filename):
+    """
+    Return the note ID at the end of a study note filename, or None.
+
+    Args:
+        filename: e.g. 'Genesis_45_16_50_26_133069.json'
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    last = stem.rsplit('_', 1)[-1]
+    return int(last) if last.isdigit() else None
+
+def build_verse_table(passages):
+    """
+    Build the CSR arrays for a set of study notes.
+
+    Each note is listed under every verse from its start key to its end key.
+    Verses past the end of a chapter in this versification are clamped to
+    its last verse.
+
+    Args:
+        passages: Iterable of ((start_key, end_key), filename) tuples
+
+    Returns:
+        Tuple of (offsets, note_ids) arrays
+    """
+    notes = []
+    for (start_key, end_key), filename in passages:
+        identifier = note_id(filename)
+        first = verse_ordinal(start_key, clamp=True)
+        last = verse_ordinal(end_key, clamp=True)
+        if identifier is None or first is None or last is None or last < first:
+            continue
+        notes.append((first, last, identifier))
+    notes.sort()
+
+    counts = [0] * (TOTAL_VERSES + 1)
+    for first, last, _ in notes:
+        for ordinal in range(first, last + 1):
+            counts[ordinal + 1] += 1
+    offsets = array('I', [0] * (TOTAL_VERSES + 1))
+    total = 0
+    for ordinal in range(1, TOTAL_VERSES + 1):
+        total += counts[ordinal]
+        offsets[ordinal] = total
+
+    note_ids = array('i', [0] * total)
+    cursor = offsets.tolist()
+    for first, last, identifier in notes:
+        for ordinal in range(first, last + 1):
+            note_ids[cursor[ordinal]] = identifier
+            cursor[ordinal] += 1
+    return offsets, note_ids
+
+def write_verse_table(passages, table_file):
+    """
+    Build and write the verse table for a set of study notes.
+
+    Args:
+        passages: Iterable of ((start_key, end_key), filename) tuples
+        table_file: Where to write the table
+
+    Returns:
+        The number of (verse, note) entries written
+    """
+    offsets, note_ids = build_verse_table(passages)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+        note_ids.byteswap()
+
+    tmp_file = table_file + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, TOTAL_VERSES, len(note_ids)))
+        f.write(offsets.tobytes())
+        f.write(note_ids.tobytes())
+    os.replace(tmp_file, table_file)
+    return len(note_ids)
+
+def read_verse_table(table_file=DEFAULT_TABLE_FILE):
+    """
+    Memory-map a verse table written by write_verse_table.
+
+    Returns:
+        A VerseTable, or None if the table is missing, malformed or was
+        written for a different versification
+    """
+    try:
+        with open(table_file, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(mapped) < _HEADER.size:
+        mapped.close()
+        return None
+    magic, verse_count, entry_count = _HEADER.unpack_from(mapped, 0)
+    offsets_end = _HEADER.size + 4 * (verse_count + 1)
+    if magic != MAGIC or verse_count != TOTAL_VERSES or len(mapped) != offsets_end + 4 * entry_count:
+        mapped.close()
+        return None
+
+    view = memoryview(mapped)
+    if sys.byteorder == 'little':
+        offsets = view[_HEADER.size:offsets_end].cast('I')
+        note_ids = view[offsets_end:].cast('i')
+    else:
+        # Views only work in the file's byte order; big-endian hosts get a swapped copy
+        offsets = array('I', view[_HEADER.size:offsets_end].tobytes())
+        note_ids = array('i', view[offsets_end:].tobytes())
+        offsets.byteswap()
+        note_ids.byteswap()
+    return VerseTable(offsets, note_ids, mapped)
+
+class VerseTable:
+    """
+    The note IDs covering each verse, indexed by verse ordinal.
+
+    Attributes:
+        offsets: Row offsets into note_ids, one per verse plus one
+        note_ids: Note IDs of every verse, row after row
+    """
+
+    def __init__(self, offsets, note_ids, mapped=None):
+        self.offsets = offsets
+        self.note_ids = note_ids
+        self._mapped = mapped
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def notes_at(self, ordinal):
+        """
+        Return the note IDs covering the verse with the given ordinal.
+        """
+        offsets = self.offsets
+        return self.note_ids[offsets[ordinal]:offsets[ordinal + 1]].tolist()
+
+    def notes_for_key(self, key):
+        """
+        Return the note IDs covering a verse key (empty for verses not in the versification).
+        """
+        ordinal = verse_ordinal(key)
+        if ordinal is None:
+            return []
+        return self.notes_at(ordinal)
+
+    def close(self):
+        """
+        Release the memory-mapped file.
+        """
+        if self._mapped is not None:
+            self.offsets.release()
+            self.note_ids.release()
+            self._mapped.close()
+            self._mapped = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up the study notes covering each verse of a reference.")
+    parser.add_argument("references", nargs="+", help="References such as 'Genesis 46:3' or 'Romans 8:1-4'")
+    parser.add_argument("--table", default=DEFAULT_TABLE_FILE, help="Verse table written by the study note conversion")
+    args = parser.parse_args()
+
+    table = read_verse_table(args.table)
+    if table is None:
+        sys.exit(f"Verse table {args.table} missing or unreadable; run convert_study_notes_to_usfm.py first")
+
+    with table:
+        for reference in args.references:
+            parsed = parse_reference(reference)
+            if parsed is None:
+                print(f"Error: Cannot parse reference '{reference}'")
+                continue
+            first = verse_ordinal(parsed.start_key, clamp=True)
+            last = verse_ordinal(parsed.end_key, clamp=True)
+            if first is None or last is None:
+                print(f"Error: '{reference}' is not in the versification")
+                continue
+            for ordinal in range(first, last + 1):
+                note_ids = table.notes_at(ordinal)
+                print(f"{format_key(key_from_ordinal(ordinal))}: {' '.join(map(str, note_ids)) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Watch the study note and key term JSON directories and keep the USFM outputs current.
+
+ExportState keeps every decoded document, the resource map and every rendered
+note and dictionary entry in memory. Each refresh stats both directories,
+decodes only the files whose size or mtime changed, re-renders those
+documents plus any that link a key term that was added, removed or renamed,
+and rewrites only the book files (and the dictionary) they belong to. When
+any note changed, the verse index, verse table and key term concordance are
+rewritten from the rendered notes as well, so lookups never go stale.
+"""
+import argparse
+import os
+import time
+from json_backend import load_document
+from build_manifest import referenced_resources
+import convert_study_notes_to_usfm as study_notes
+import convert_to_usfm as key_terms
+
+DEFAULT_NOTES_DIR = "./json BiblicaStudyNotes/json/"
+DEFAULT_KEY_TERMS_DIR = "./json BiblicaStudyNotesKeyTerms/json/"
+DEFAULT_OUTPUT_DIR = "./usfm_study_notes/"
+DEFAULT_DICTIONARY_FILE = "./BiblicaKeyTerms.sfm"
+
+def _scan(json_dir, known):
+    """
+    Compare a directory against the (size, mtime) signatures already loaded.
+
+    Returns:
+        Tuple of (changed filenames, removed filenames, filename -> current signature)
+    """
+    current = {}
+    with os.scandir(json_dir) as it:
+        for entry in it:
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                current[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+    changed = [name for name, signature in current.items()
+               if name not in known or known[name][0] != signature]
+    removed = [name for name in known if name not in current]
+    return sorted(changed), removed, current
+
+def _write_if_changed(output_file, content):
+    """
+    Write content to a file unless it already holds exactly that content.
+    """
+    try:
+        with open(output_file, 'r', encoding='utf-8', newline='') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+class ExportState:
+    """
+    In-memory corpus, resource map and rendered output for incremental regeneration.
+    """
+
+    def __init__(self, notes_dir=DEFAULT_NOTES_DIR, key_terms_dir=DEFAULT_KEY_TERMS_DIR,
+                 output_dir=DEFAULT_OUTPUT_DIR, dictionary_file=DEFAULT_DICTIONARY_FILE):
+        self.notes_dir = notes_dir
+        self.key_terms_dir = key_terms_dir
+        self.output_dir = output_dir
+        self.dictionary_file = dictionary_file
+
+        # filename -> ((size, mtime), Document or None if it failed to decode)
+        self.notes = {}
+        self.key_terms = {}
+        self.resource_map = {}
+
+        # filename -> (book_name, (start_key, end_key), usfm_content, occurrences) / dictionary entry
+        self.rendered_notes = {}
+        self.rendered_entries = {}
+
+        # filename -> resourceIds linked from that document
+        self.note_resources = {}
+        self.entry_resources = {}
+
+    def _load(self, json_dir, documents, changed, removed, signatures):
+        for filename in removed:
+            del documents[filename]
+        for filename in changed:
+            try:
+                data = load_document(os.path.join(json_dir, filename))
+            except Exception as e:
+                print(f"Error processing {filename}: {e}")
+                data = None
+            documents[filename] = (signatures[filename], data)
+
+    def _rebuild_resource_map(self):
+        resource_map = {}
+        for filename in sorted(self.key_terms):
+            data = self.key_terms[filename][1]
+            if data is None:
+                continue
+            resource_id = str(data.reference_id) if data.reference_id is not None else ''
+            if resource_id and data.name:
+                resource_map[resource_id] = data.name
+
+        changed = set(self.resource_map.keys() ^ resource_map.keys())
+        for resource_id, name in resource_map.items():
+            if resource_id in self.resource_map and self.resource_map[resource_id] != name:
+                changed.add(resource_id)
+        self.resource_map = resource_map
+        return changed
+
+    def render_note(self, filename):
+        """
+        Re-render one loaded study note and record the key terms it links.
+        """
+        data = self.notes[filename][1]
+        self.rendered_notes.pop(filename, None)
+        self.note_resources.pop(filename, None)
+        if data is None:
+            return
+        try:
+            self.rendered_notes[filename] = study_notes.process_document(filename, data, self.resource_map)
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+            return
+        self.note_resources[filename] = set(referenced_resources([item.tiptap for item in data.content]))
+
+    def render_entry(self, filename):
+        """
+        Re-render one loaded dictionary entry and record the key terms it links.
+        """
+        data = self.key_terms[filename][1]
+        self.rendered_entries.pop(filename, None)
+        self.entry_resources.pop(filename, None)
+        if data is None:
+            return
+        try:
+            self.rendered_entries[filename] = key_terms.process_document(data, self.resource_map)
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+            return
+        self.entry_resources[filename] = set(referenced_resources([item.tiptap for item in data.content]))
+
+    def book_notes(self, book_name):
+        """
+        Return the ((start_key, end_key), usfm_content) tuples currently rendered for a book.
+        """
+        return [(passage, usfm_content)
+                for name, passage, usfm_content, _ in self.rendered_notes.values()
+                if name == book_name]
+
+    def write_book(self, book_name):
+        """
+        Write one book file from the rendered notes, returning its path.
+        """
+        output_file = study_notes.book_output_path(self.output_dir, book_name)
+        _write_if_changed(output_file, study_notes.render_book(book_name, self.book_notes(book_name)))
+        return output_file
+
+    def write_note_index(self):
+        """
+        Write the verse index, verse table and concordance of the rendered notes, returning their paths.
+        """
+        return study_notes.write_note_index(
+            self.output_dir, ((passage, filename, occurrences)
+                              for filename, (_, passage, _, occurrences) in sorted(self.rendered_notes.items())))
+
+    def write_dictionary(self):
+        """
+        Write the dictionary from the rendered entries, returning its path.
+        """
+        _write_if_changed(self.dictionary_file, key_terms.render_dictionary(self.rendered_entries.items()))
+        return self.dictionary_file
+
+    def refresh(self):
+        """
+        Pick up changes on disk and regenerate the affected outputs.
+
+        Returns:
+            List of output files regenerated (empty if nothing changed)
+        """
+        changed_terms, removed_terms, term_signatures = _scan(self.key_terms_dir, self.key_terms)
+        changed_notes, removed_notes, note_signatures = _scan(self.notes_dir, self.notes)
+        if not (changed_terms or removed_terms or changed_notes or removed_notes):
+            return []
+
+        self._load(self.key_terms_dir, self.key_terms, changed_terms, removed_terms, term_signatures)
+        self._load(self.notes_dir, self.notes, changed_notes, removed_notes, note_signatures)
+        changed_ids = self._rebuild_resource_map()
+
+        # Documents linking a key term that appeared, disappeared or was renamed are stale too
+        notes_to_render = set(changed_notes)
+        entries_to_render = set(changed_terms)
+        if changed_ids:
+            notes_to_render.update(name for name, resources in self.note_resources.items()
+                                   if resources & changed_ids)
+            entries_to_render.update(name for name, resources in self.entry_resources.items()
+                                     if resources & changed_ids)
+
+        dirty_books = set()
+        for filename in removed_notes:
+            previous = self.rendered_notes.pop(filename, None)
+            self.note_resources.pop(filename, None)
+            if previous is not None:
+                dirty_books.add(previous[0])
+        for filename in sorted(notes_to_render):
+            previous = self.rendered_notes.get(filename)
+            if previous is not None:
+                dirty_books.add(previous[0])
+            self.render_note(filename)
+            if filename in self.rendered_notes:
+                dirty_books.add(self.rendered_notes[filename][0])
+
+        for filename in removed_terms:
+            self.rendered_entries.pop(filename, None)
+            self.entry_resources.pop(filename, None)
+        for filename in sorted(entries_to_render):
+            self.render_entry(filename)
+
+        written = [self.write_book(book_name) for book_name in sorted(dirty_books)]
+        if notes_to_render or removed_notes:
+            written.extend(self.write_note_index())
+        if entries_to_render or removed_terms:
+            written.append(self.write_dictionary())
+        return written
+
+def watch(state, interval=0.1):
+    """
+    Poll for changes forever, regenerating affected outputs as they appear.
+    """
+    print(f"Watching {state.notes_dir} and {state.key_terms_dir} (Ctrl+C to stop)")
+    try:
+        while True:
+            start = time.perf_counter()
+            written = state.refresh()
+            if written:
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"Regenerated {len(written)} file(s) in {elapsed:.0f} ms: {', '.join(written)}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate USFM outputs as the JSON inputs change.")
+    parser.add_argument("--interval", type=float, default=0.1, help="Polling interval in seconds")
+    args = parser.parse_args()
+
+    os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+    state = ExportState()
+    print("Loading corpus...")
+    start = time.perf_counter()
+    state.refresh()
+    print(f"Loaded {len(state.notes)} study notes and {len(state.key_terms)} key terms "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    watch(state, args.interval)
+
+if __name__ == "__main__":
+    main()